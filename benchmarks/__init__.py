@@ -0,0 +1,53 @@
+"""Performance benchmarks, run with ``python -m benchmarks``.
+
+Benchmarks run headless on SDL's dummy video driver. Each benchmark is a
+function registered with ``@benchmark`` that returns a dict of results,
+which the runner collects into a single JSON document.
+"""
+from typing import Any, Callable, Dict, Optional
+import os
+import statistics
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+BENCHMARKS: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+def benchmark(name: str):
+    """Register a benchmark function under ``name``"""
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+def measure(fn: Callable[[], Any], number: Optional[int] = None, repeat: int = 5, min_time: float = 0.1) -> Dict[str, float]:
+    """Time ``fn``, returns per-call statistics in seconds
+
+    If ``number`` is not given, calls per repeat are scaled so that a repeat
+    takes at least ``min_time`` seconds.
+    """
+    if number is None:
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            if time.perf_counter() - start >= min_time:
+                break
+            number *= 2
+    per_call = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - start) / number)
+    best = min(per_call)
+    return {
+        'number': number,
+        'repeat': repeat,
+        'min': best,
+        'median': statistics.median(per_call),
+        'per_second': 1 / best if best > 0 else float('inf'),
+    }
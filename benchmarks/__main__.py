@@ -0,0 +1,63 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks import BENCHMARKS
+from benchmarks import imports, scene, renderers, datastore, touch, stream  # noqa: F401, registers benchmarks
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the experiment benchmarks")
+    parser.add_argument('names', nargs='*', help="benchmarks to run, by default all")
+    parser.add_argument('--output', '-o', type=Path, default=None, help="write results to this JSON file")
+    parser.add_argument('--list', action='store_true', help="list benchmarks and exit")
+    parser.add_argument('--check', action='store_true', help="exit with an error if a budget is exceeded")
+    args = parser.parse_args(argv)
+    if args.list:
+        print('\n'.join(BENCHMARKS))
+        return 0
+    names = args.names or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+    import pygame
+    results = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'benchmarks': {},
+    }
+    for name in names:
+        start = time.perf_counter()
+        results['benchmarks'][name] = BENCHMARKS[name]()
+        print(f"{name}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    output = json.dumps(results, indent=2)
+    if args.output is not None:
+        args.output.write_text(output)
+    else:
+        print(output)
+    if args.check:
+        over = [f"{name}.{key}" for name, result in results['benchmarks'].items()
+            for key, value in result.items() if isinstance(value, dict) and value.get('within_budget') is False]
+        if over:
+            print(f"Over budget: {', '.join(over)}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import benchmark, measure
+from experiment.datastore.jsonstore import JSONDataStore
+from experiment.datastore.sqlite import SQLiteDataStore
+from experiment.manager import Logger, AsyncLogger
+
+@benchmark('jsonstore')
+def jsonstore():
+    """JSONDataStore.record and flush, for a trial of 10 scalar fields"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JSONDataStore(tmp)
+        fields = {f'field_{i}': i * 0.5 for i in range(10)}
+        def record():
+            # a fresh trial each call, so values do not accumulate into lists
+            store.record(**fields)
+            store.key_is_scalar = {}
+            store.trialid += 1
+        record = measure(record)
+        def trial():
+            store.record(**fields)
+            store.flush()
+            store.trialid += 1
+        return {'record': record, 'trial': measure(trial)}
+
+@benchmark('sqlitestore')
+def sqlitestore():
+    """SQLiteDataStore.flush on the caller's thread and the time to commit 1000 trials"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteDataStore(tmp)
+        fields = {f'field_{i}': i * 0.5 for i in range(10)}
+        def trial():
+            store.record(**fields)
+            store.flush()
+            store.trialid += 1
+        result = {'trial': measure(trial)}
+        store.close()
+        commit_directory = Path(tmp, 'commit')
+        commit_directory.mkdir()
+        store = SQLiteDataStore(commit_directory)
+        start = time.perf_counter()
+        for _ in range(1000):
+            trial()
+        store.close()
+        result['commit_1000'] = time.perf_counter() - start
+        return result
+
+@benchmark('logger')
+def logger(n_events: int = 20000):
+    """Logger.log_event throughput for the sync and async loggers
+
+    Each run logs ``n_events`` events and closes the logger, so the async
+    logger is timed until its writer thread has written everything. Its queue
+    holds all the events, ``dropped`` is only there as a sanity check.
+    """
+    event = {'type': 'mouse_down', 'x': 100, 'y': 200, 'time': 12.5, 'scene': 3, 'frame': 40}
+    loggers = {'sync': Logger, 'async': lambda: AsyncLogger(max_queue_size=n_events)}
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, make_logger in loggers.items():
+            runs = []
+            dropped = 0
+            for i in range(5):
+                log = make_logger()
+                log.register_stream_handler(Path(tmp, f'{name}_{i}.log'))
+                start = time.perf_counter()
+                for _ in range(n_events):
+                    log.log_event('event', event)
+                log.close()
+                runs.append((time.perf_counter() - start) / n_events)
+                dropped += getattr(log, 'dropped', 0)
+            best = min(runs)
+            results[name] = {
+                'number': n_events,
+                'repeat': len(runs),
+                'min': best,
+                'median': statistics.median(runs),
+                'per_second': 1 / best if best > 0 else float('inf'),
+                'dropped': dropped,
+            }
+    return results
@@ -0,0 +1,47 @@
+import json
+import statistics
+import subprocess
+import sys
+
+from benchmarks import benchmark
+
+# seconds, for a warm filesystem cache
+IMPORT_BUDGETS = {
+    'experiment.__main__': 0.15,
+    'experiment.manager': 0.15,
+    'experiment.engine.headless': 0.2,
+}
+# must not be imported until an engine, renderer or remote server needs them
+HEAVY_MODULES = ('pygame', 'flask', 'flask_socketio', 'cv2', 'numpy', 'PIL', 'yaml', 'serial')
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{'time': elapsed, 'heavy': heavy}}))
+"""
+
+def measure_import(module: str, repeat: int = 5) -> dict:
+    """Median import time of a module in a fresh interpreter and the heavy modules it pulls in"""
+    script = SCRIPT.format(module=module, heavy=HEAVY_MODULES)
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    median = statistics.median(run['time'] for run in runs)
+    heavy = runs[-1]['heavy']
+    budget = IMPORT_BUDGETS.get(module)
+    return {
+        'median': median,
+        'budget': budget,
+        'heavy_modules': heavy,
+        'within_budget': (budget is None or median <= budget) and not heavy,
+    }
+
+@benchmark('import_time')
+def import_time(repeat: int = 5):
+    """Import time of the entry points in a fresh interpreter, checked
+    against IMPORT_BUDGETS, and heavy modules they pull in"""
+    return {module: measure_import(module, repeat) for module in IMPORT_BUDGETS}
@@ -0,0 +1,42 @@
+import tempfile
+
+from PIL import Image
+
+from benchmarks import benchmark, measure
+from benchmarks.scene import make_manager, make_adapters
+from experiment.experiments.adapters.graphic import ImageAdapter
+
+IMAGE_SIZES = (32, 128, 512, 1024)
+
+@benchmark('pygame_draw_image')
+def pygame_draw_image():
+    """PygameRenderer.draw_image per call by image size, with a warm surface
+    cache and with the image invalidated before every draw"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = make_manager(tmp)
+        renderer = manager.renderer
+        for size in IMAGE_SIZES:
+            adapter = ImageAdapter(Image.new('RGB', (size, size), (10, 200, 30)), position=(400, 300), size=(size, size))
+            cached = measure(lambda: renderer.draw_image(adapter))
+            def uncached():
+                adapter.invalidate()
+                renderer.draw_image(adapter)
+            results[f"{size}px"] = {'cached': cached, 'uncached': measure(uncached, repeat=3)}
+        manager.cleanup()
+    return results
+
+@benchmark('flask_renderer_flip')
+def flask_renderer_flip():
+    """FlaskRenderer.flip cost for a populated canvas, PNG encode (sync) and
+    snapshot only (async publishing)"""
+    from experiment.engine.flask.flask import FlaskRenderer
+    results = {}
+    for size in ((400, 300), (800, 600), (1920, 1080)):
+        for mode in ('sync', 'async'):
+            renderer = FlaskRenderer(size=size, publish_params={'mode': mode})
+            renderer.clear()
+            for adapter in make_adapters(10):
+                adapter.render(renderer)
+            results[f"{mode}_{size[0]}x{size[1]}"] = measure(renderer.flip, repeat=3)
+    return results
@@ -0,0 +1,52 @@
+import tempfile
+import time
+
+from PIL import Image
+
+from benchmarks import benchmark
+from experiment.engine.pygame import PygameManager
+from experiment.experiments.adapters import TimeCounter
+from experiment.experiments.adapters.graphic import RectAdapter, CircleAdapter, ImageAdapter
+from experiment.experiments.scene import Scene
+from experiment.util.clock import VirtualClock
+from experiment.util.pacing import VirtualFramePacer
+
+SCREEN_SIZE = (800, 600)
+
+def make_manager(data_directory, retained: bool = False) -> PygameManager:
+    """Pygame manager whose scenes run unpaced, as fast as frames can be produced"""
+    config = {'display': {'size': SCREEN_SIZE, 'retained': retained}}
+    manager = PygameManager(data_directory, config, clock=VirtualClock())
+    manager.create_frame_pacer = lambda: VirtualFramePacer(manager.frame_duration, manager.clock)
+    return manager
+
+def make_adapters(n: int):
+    image = Image.new('RGB', (64, 64), (200, 50, 50))
+    adapters = []
+    for i in range(n):
+        x, y = 50 + (i * 37) % 700, 50 + (i * 53) % 500
+        adapters.append(RectAdapter(position=(x, y), size=(40, 30), colour='WHITE'))
+        adapters.append(CircleAdapter(position=(x + 10, y + 10), size=15, colour='#ff0000', bbox={'width': 30, 'height': 30}))
+        adapters.append(ImageAdapter(image, position=(x + 20, y + 20), size=(64, 64)))
+    return adapters
+
+@benchmark('scene_fps')
+def scene_fps(n_frames: int = 300):
+    """Frames per second of Scene.run with N rect, circle and image adapters each"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for retained in (False, True):
+            for n in (1, 10, 50):
+                manager = make_manager(tmp, retained)
+                counter = TimeCounter((n_frames - 0.5) * manager.frame_duration, children=make_adapters(n))
+                start = time.perf_counter()
+                Scene(manager, counter).run()
+                elapsed = time.perf_counter() - start
+                frames = manager.frame_index + 1
+                manager.cleanup()
+                results[f"{'retained' if retained else 'immediate'}_n{n}"] = {
+                    'adapters': 3 * n,
+                    'frames': frames,
+                    'fps': frames / elapsed,
+                }
+    return results
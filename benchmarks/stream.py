@@ -0,0 +1,55 @@
+import tempfile
+import threading
+import time
+
+from benchmarks import benchmark
+from benchmarks.scene import make_manager, make_adapters
+
+@benchmark('remote_stream')
+def remote_stream(duration: float = 2.0):
+    """Frames per second delivered by FlaskServer.generate_stream while the
+    scene redraws as fast as possible"""
+    from experiment.remote.flask import FlaskServer
+    from experiment.remote.broadcast import FrameBroadcaster
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in (0.5, 1.0):
+            manager = make_manager(tmp)
+            renderer = manager.renderer
+            renderer.capture_interval = 0.
+            renderer.capture_scale = scale
+            server = FlaskServer(show=False)
+            server.manager = manager
+            server.broadcaster = FrameBroadcaster(renderer, fps=1000)
+            adapters = make_adapters(10)
+            running = True
+            def render():
+                frame = 0
+                while running:
+                    renderer.clear()
+                    for adapter in adapters:
+                        adapter.position = (adapter.position[0], (adapter.position[1] + 1) % 600)
+                        adapter.render(renderer)
+                    renderer.flip()
+                    frame += 1
+            thread = threading.Thread(target=render, daemon=True)
+            thread.start()
+            stream = server.generate_stream()
+            next(stream)
+            frames, nbytes = 0, 0
+            start = time.perf_counter()
+            while time.perf_counter() - start < duration:
+                chunk = next(stream)
+                frames += 1
+                nbytes += len(chunk)
+            elapsed = time.perf_counter() - start
+            stream.close()
+            running = False
+            thread.join()
+            manager.cleanup()
+            results[f"scale{scale}"] = {
+                'fps': frames / elapsed,
+                'mean_frame_bytes': nbytes / frames if frames else 0,
+                'encoded': server.broadcaster.encoded,
+            }
+    return results
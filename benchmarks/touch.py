@@ -0,0 +1,16 @@
+from benchmarks import benchmark, measure
+from experiment.experiments.adapters.graphic import RectAdapter
+
+@benchmark('bbox_detect_touch')
+def bbox_detect_touch():
+    """BBox.detect_touch over every item for a frame's worth of events"""
+    results = {}
+    for n_items in (1, 10, 100):
+        items = [RectAdapter(position=(20 + i * 7 % 780, 20 + i * 13 % 580), size=(20, 20), colour='WHITE') for i in range(n_items)]
+        for n_events in (1, 10, 100):
+            events = [{'type': 'mouse_drag', 'x': i * 11 % 800, 'y': i * 17 % 600} for i in range(n_events)]
+            def detect():
+                for item in items:
+                    item.bbox.detect_touch(item, events)
+            results[f"items{n_items}_events{n_events}"] = measure(detect)
+    return results
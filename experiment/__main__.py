@@ -1,9 +1,12 @@
+from typing import TYPE_CHECKING
 from experiment.util.config import load_config
 
-from experiment.manager import Manager
-from experiment.engine.pygame import PygameManager
+from experiment.registry import ENGINES
 from pathlib import Path
 
+if TYPE_CHECKING:
+    from experiment.manager import Manager
+
 default_config = {
     'engine': 'pygame',
     'data_directory': './data',
@@ -41,24 +44,26 @@ def recursive_update(d, u):
             d[k] = v
     return d
 
-def load_manager(config: dict) -> Manager:
+def load_manager(config: dict) -> "Manager":
     engine = config.get('engine', 'pygame')
-    if engine != 'pygame':
-        raise ValueError(f'Unsupported engine: {engine}')
+    manager_cls = ENGINES.get(engine)
     data_directory = Path(config.get('data_directory', './data'))
     monkey = config.get('name')
     if monkey is not None:
         data_directory = data_directory / monkey
     data_directory.mkdir(parents=True, exist_ok=True)
     cfg = recursive_update(default_config.copy(), config)
-    mgr = PygameManager(data_directory, cfg)
+    mgr = manager_cls(data_directory=data_directory, config=cfg)
     return mgr
 
 def main(config, **overrides):
     cfg = load_config(config)
     cfg = recursive_update(cfg, overrides)
     mgr = load_manager(cfg)
-    mgr.run_session_from_config(cfg)
+    try:
+        mgr.run_session_from_config(cfg)
+    finally:
+        mgr.cleanup()
 
 if __name__ == "__main__":
     import sys
@@ -77,5 +82,7 @@ if __name__ == "__main__":
         overrides['display'] = {'fullscreen': False}
     elif '--strict' in sys.argv:
         overrides['strict_mode'] = True
+    if '--headless' in sys.argv:
+        overrides['engine'] = 'headless'
 
     main(config, **overrides)
\ No newline at end of file
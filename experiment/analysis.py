@@ -0,0 +1,323 @@
+"""Load many sessions into typed numpy columns for cross-session analysis.
+
+Session directories, anything below the data directory holding a
+``data.jsonl`` or ``data.sqlite``, are parsed in a process pool. Each
+session's trials become a table, a dict of column name to array, with a
+column per recorded key:
+
+- bools, ints and floats become bool, int64 or float64 arrays; a column with
+  trials where the key is missing becomes float64 with NaN,
+- strings become unicode arrays, with '' where missing,
+- keys recorded more than once in a trial become object arrays holding a
+  typed array per trial,
+- anything else is kept as JSON text.
+
+Selected ``manager.log`` events can be loaded into tables in the same way,
+using the byte offset index when there is one. The parsed tables are cached
+as ``analysis.npz`` in each session directory and only parsed again when the
+data or log files change size or modification time::
+
+    sessions = load_sessions('data/', events=['Reward'], workers=8)
+    trials = concat([session.trials for session in sessions])
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import quote, unquote
+import json
+import sqlite3
+
+import numpy as np
+
+from experiment.datastore.index import LogIndex, index_path
+
+Table = Dict[str, np.ndarray]
+
+CACHE_NAME = 'analysis.npz'
+# bump when the parsed layout changes, to invalidate existing caches
+CACHE_VERSION = 2
+DATA_FILES = ('data.jsonl', 'data.sqlite')
+
+_MISSING = object()
+
+
+@dataclass
+class Session:
+    path: Path
+    trials: Table
+    events: Dict[str, Table] = field(default_factory=dict)
+    cached: bool = False
+
+    @property
+    def n_trials(self) -> int:
+        return len(next(iter(self.trials.values()), ()))
+
+
+def find_sessions(data_directory: str | Path) -> List[Path]:
+    """Session directories below ``data_directory``, in path order"""
+    sessions = set()
+    for name in DATA_FILES:
+        sessions.update(path.parent for path in Path(data_directory).rglob(name))
+    return sorted(sessions)
+
+
+def _scalar_column(values: Sequence[Any]) -> np.ndarray:
+    present = [v for v in values if v is not _MISSING and v is not None]
+    missing = len(present) < len(values)
+    kinds = {type(v) for v in present}
+    if kinds <= {bool} and not missing:
+        return np.array(values, dtype=bool)
+    if kinds <= {bool, int} and not missing:
+        return np.array(values, dtype=np.int64)
+    if kinds <= {bool, int, float}:
+        return np.array([np.nan if v is _MISSING or v is None else v for v in values], dtype=np.float64)
+    if kinds <= {str}:
+        return np.array(['' if v is _MISSING or v is None else v for v in values], dtype=str)
+    return np.array(['' if v is _MISSING else v if isinstance(v, str) else json.dumps(v) for v in values], dtype=str)
+
+
+def to_column(values: Sequence[Any], repeated: bool = False) -> np.ndarray:
+    """Typed column from the values of a key, ``_MISSING`` where a row lacks it
+
+    With ``repeated`` the values are lists, e.g. from a key recorded more
+    than once in a trial, and the column holds an array per row.
+    """
+    if not repeated:
+        return _scalar_column(values)
+    rows = [[] if v is _MISSING else v if isinstance(v, list) else [v] for v in values]
+    flat = _scalar_column([v for row in rows for v in row])
+    column = np.empty(len(rows), dtype=object)
+    start = 0
+    for i, row in enumerate(rows):
+        column[i] = flat[start:start + len(row)]
+        start += len(row)
+    return column
+
+
+def to_table(records: Iterable[Dict[str, Any]], repeated: Optional[Iterable[str]] = None) -> Table:
+    """Columns from a sequence of records
+
+    Keys listed in ``repeated``, or whose value is a list in any record,
+    become array per row columns.
+    """
+    records = list(records)
+    keys: Dict[str, bool] = {}
+    for record in records:
+        for k, v in record.items():
+            keys[k] = keys.get(k, False) or isinstance(v, list)
+    for k in repeated or ():
+        if k in keys:
+            keys[k] = True
+    return {k: to_column([record.get(k, _MISSING) for record in records], is_list) for k, is_list in keys.items()}
+
+
+def read_jsonl_records(path: Path) -> List[Dict[str, Any]]:
+    with open(path, 'rb') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def read_sqlite_records(path: Path) -> tuple[List[Dict[str, Any]], set]:
+    """Trials of a SQLiteDataStore database and the keys recorded more than once"""
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    connection.row_factory = sqlite3.Row
+    try:
+        records = {row['trialid']: {k: row[k] for k in row.keys() if row[k] is not None} for row in connection.execute("SELECT * FROM trials ORDER BY trialid")}
+        repeated = set()
+        for trialid, key, value in connection.execute("SELECT trialid, key, value FROM trial_values ORDER BY trialid, key, idx"):
+            record = records.get(trialid)
+            if record is None:
+                continue
+            # the trials table holds the first value, replace it by all of them
+            if not isinstance(record.get(key), list):
+                record[key] = []
+            repeated.add(key)
+            record[key].append(value)
+    finally:
+        connection.close()
+    return list(records.values()), repeated
+
+
+def read_events(path: Path, events: Sequence[str]) -> Dict[str, Table]:
+    """Tables of the given events from a manager.log"""
+    entries: Dict[str, List[Dict[str, Any]]] = {name: [] for name in events}
+    if index_path(path).exists():
+        with LogIndex(path) as index:
+            for entry in index.events(list(events)):
+                entries[entry.pop('event')].append(entry)
+    else:
+        with open(path, 'rb') as f:
+            for line in f:
+                entry = json.loads(line) if line.strip() else {}
+                if entry.get('event') in entries:
+                    entries[entry.pop('event')].append(entry)
+    return {name: to_table(records) for name, records in entries.items()}
+
+
+def _source_files(session_directory: Path, events: Sequence[str]) -> List[Path]:
+    data = next(session_directory / name for name in DATA_FILES if (session_directory / name).exists())
+    files = [data]
+    if events:
+        files.append(session_directory / 'manager.log')
+    return files
+
+
+def _signature(session_directory: Path, events: Sequence[str]) -> Dict[str, Any]:
+    files = {}
+    for path in _source_files(session_directory, events):
+        stat = path.stat()
+        files[path.name] = [stat.st_size, stat.st_mtime_ns]
+    wal = session_directory / 'data.sqlite-wal'
+    if 'data.sqlite' in files and wal.exists():
+        # readers touch the write-ahead log, only its size tells of new trials
+        files[wal.name] = [wal.stat().st_size]
+    return {'version': CACHE_VERSION, 'events': sorted(events), 'files': files}
+
+
+def _save_cache(path: Path, signature: Dict[str, Any], session: Session):
+    arrays: Dict[str, np.ndarray] = {'__signature__': np.array(json.dumps(signature))}
+    # keys and event names are quoted, so that they cannot contain the '/' and ':' used here
+    tables = {'trials': session.trials, **{f'events/{quote(name, safe="")}': table for name, table in session.events.items()}}
+    for prefix, table in tables.items():
+        for key, column in table.items():
+            name = f'{prefix}/{quote(key, safe="")}'
+            if column.dtype == object:
+                # array per row columns are stored flat with row offsets
+                arrays[name] = np.concatenate(list(column)) if len(column) else np.array([])
+                arrays[name + ':offsets'] = np.cumsum([0] + [len(row) for row in column])
+            else:
+                arrays[name] = column
+    tmp = path.with_name(path.name + '.tmp.npz')
+    np.savez(tmp, **arrays)
+    tmp.replace(path)
+
+
+def _load_cache(path: Path, signature: Dict[str, Any]) -> Optional[Session]:
+    try:
+        with np.load(path, allow_pickle=False) as cache:
+            if json.loads(cache['__signature__'].item()) != signature:
+                return None
+            arrays = {name: cache[name] for name in cache.files}
+        session = Session(path.parent, {}, {name: {} for name in signature['events']}, cached=True)
+        for name, values in arrays.items():
+            if name == '__signature__' or name.endswith(':offsets'):
+                continue
+            prefix, key = name.rsplit('/', 1)
+            table = session.trials if prefix == 'trials' else session.events[unquote(prefix.split('/', 1)[1])]
+            offsets = arrays.get(name + ':offsets')
+            if offsets is None:
+                table[unquote(key)] = values
+            else:
+                column = np.empty(len(offsets) - 1, dtype=object)
+                for i in range(len(column)):
+                    column[i] = values[offsets[i]:offsets[i + 1]]
+                table[unquote(key)] = column
+    except (OSError, ValueError, KeyError):
+        # unreadable or from another layout, parse the session again
+        return None
+    return session
+
+
+def load_session(session_directory: str | Path, events: Sequence[str] = (), cache: bool = True) -> Session:
+    """Trials and selected log events of one session, from the cache if it is up to date"""
+    session_directory = Path(session_directory)
+    signature = _signature(session_directory, events)
+    cache_path = session_directory / CACHE_NAME
+    if cache and cache_path.exists():
+        session = _load_cache(cache_path, signature)
+        if session is not None:
+            return session
+    data = _source_files(session_directory, events)[0]
+    if data.suffix == '.sqlite':
+        records, repeated = read_sqlite_records(data)
+        trials = to_table(records, repeated)
+    else:
+        trials = to_table(read_jsonl_records(data))
+    session = Session(session_directory, trials)
+    if events:
+        session.events = read_events(session_directory / 'manager.log', events)
+    if cache:
+        _save_cache(cache_path, signature, session)
+    return session
+
+
+def load_sessions(data_directory: str | Path | Sequence[str | Path], events: Sequence[str] = (), workers: Optional[int] = None, cache: bool = True) -> List[Session]:
+    """Load every session below a data directory, or a list of session directories, in a process pool"""
+    if isinstance(data_directory, (str, Path)):
+        sessions = find_sessions(data_directory)
+    else:
+        sessions = [Path(path) for path in data_directory]
+    if not sessions:
+        return []
+    events = list(events)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(load_session, sessions, [events] * len(sessions), [cache] * len(sessions)))
+
+
+def _fill(column: np.ndarray, n: int) -> np.ndarray:
+    """Column of ``n`` missing values of the same kind as ``column``"""
+    if column.dtype == object:
+        fill = np.empty(n, dtype=object)
+        for i in range(n):
+            fill[i] = np.array([])
+        return fill
+    if column.dtype.kind == 'U':
+        return np.full(n, '', dtype=column.dtype)
+    return np.full(n, np.nan)
+
+
+def concat(tables: Sequence[Table], key: Optional[str] = 'session') -> Table:
+    """Concatenate tables, filling columns missing from some of them
+
+    With ``key`` a column of that name holds the position of each row's
+    table in ``tables``.
+    """
+    lengths = [len(next(iter(table.values()), ())) for table in tables]
+    names: Dict[str, np.ndarray] = {}
+    for table in tables:
+        for name, column in table.items():
+            names.setdefault(name, column)
+    result: Table = {}
+    for name, example in names.items():
+        parts = []
+        ragged = any(table[name].dtype == object for table in tables if name in table)
+        for table, n in zip(tables, lengths):
+            column = table.get(name)
+            if column is None:
+                column = _fill(np.empty(0, dtype=object) if ragged else example, n)
+            elif ragged and column.dtype != object:
+                rows = np.empty(n, dtype=object)
+                for i in range(n):
+                    rows[i] = column[i:i + 1]
+                column = rows
+            parts.append(column)
+        if ragged:
+            result[name] = np.concatenate(parts) if parts else np.empty(0, dtype=object)
+            continue
+        kinds = {part.dtype.kind for part in parts}
+        if 'U' in kinds and kinds != {'U'}:
+            parts = [part.astype(str) for part in parts]
+        elif kinds & {'f'} and kinds - {'f'}:
+            # ints and bools next to missing values
+            parts = [part.astype(np.float64) for part in parts]
+        result[name] = np.concatenate(parts)
+    if key is not None:
+        result[key] = np.repeat(np.arange(len(tables)), lengths)
+    return result
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Parse and cache the sessions below a data directory")
+    parser.add_argument('data_directory')
+    parser.add_argument('--events', nargs='*', default=[])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    sessions = load_sessions(args.data_directory, args.events, args.workers, cache=not args.no_cache)
+    elapsed = time.perf_counter() - start
+    parsed = sum(not session.cached for session in sessions)
+    n_trials = sum(session.n_trials for session in sessions)
+    print(f"{len(sessions)} sessions, {n_trials} trials, {parsed} parsed, {len(sessions) - parsed} cached, {elapsed:.2f}s")
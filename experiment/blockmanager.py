@@ -1,6 +1,6 @@
 import random
 from collections import ChainMap
-from typing import Dict, Any, TYPE_CHECKING
+from typing import Dict, Any, Optional, TYPE_CHECKING
 from experiment.util.python_import_helper import load_object_from_module
 
 if TYPE_CHECKING:
@@ -10,7 +10,8 @@ class BlockManager:
     DEFAULT_METHOD = 'incremental'
     def __init__(self, 
         config: Dict[str, Any], 
-        trials: "Dict[str, type[Trial]]"
+        trials: "Dict[str, type[Trial]]",
+        rng: Optional[random.Random] = None
     ):
         blocks = config['blocks']
         self.conditions = config['conditions']
@@ -24,6 +25,7 @@ class BlockManager:
         self.trial_in_block = 0
         self.n_trials_completed = 0
         self.trials = trials
+        self.rng = rng if rng is not None else random.Random()
 
     @classmethod
     def from_config(cls, config: Dict[str, Any]) -> "BlockManager":
@@ -83,7 +85,7 @@ class BlockManager:
         if method == 'incremental':
             condition_idx = self.trial_in_block % len(self.current_block['conditions'])
         elif method == 'random':
-            condition_idx = random.randint(0, len(self.current_block['conditions'])-1)
+            condition_idx = self.rng.randint(0, len(self.current_block['conditions'])-1)
         else:
             raise ValueError(f"Unknown method {method}")
         condition_name = self.current_block['conditions'][condition_idx]
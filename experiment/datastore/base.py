@@ -1,12 +1,44 @@
+from typing import TYPE_CHECKING, Any, Dict
 from pathlib import Path
 
+if TYPE_CHECKING:
+    from experiment.datastore.stream import SampleStream
+
 class DataStore:
     def __init__(self) -> None:
         self.trialid = 0
         self.session_directory = Path('.')
+        self.streams: "Dict[str, SampleStream]" = {}
     def flush(self) -> None:
         pass
     def close(self) -> None:
         pass
     def record(self, **kwargs) -> None:
         pass
+    @property
+    def current_trial_record(self) -> Dict[str, Any]:
+        return {"trialid": self.trialid}
+    def stream(self, name: str, dtype: Any = None, chunk_size: int = 4096) -> "SampleStream":
+        """Typed sample stream stored in ``<name>.npy`` in the session directory
+
+        The stream is created on first use, which needs a ``dtype``, e.g.
+        ``stream('touch', dtype=[('t', 'f8'), ('x', 'i4'), ('y', 'i4')])``.
+        Each trial with samples records ``<name>_offset`` and ``<name>_length``.
+        """
+        stream = self.streams.get(name)
+        if stream is None:
+            if dtype is None:
+                raise ValueError(f"Stream {name} does not exist, a dtype is needed to create it")
+            from experiment.datastore.stream import SampleStream
+            stream = self.streams[name] = SampleStream(Path(self.session_directory, f"{name}.npy"), dtype, chunk_size)
+        return stream
+    def flush_streams(self) -> None:
+        """Record references to this trial's samples, call before writing the trial"""
+        for name, stream in self.streams.items():
+            offset, length = stream.mark()
+            if length:
+                self.record(**{f"{name}_offset": offset, f"{name}_length": length})
+            stream.flush()
+    def close_streams(self) -> None:
+        for stream in self.streams.values():
+            stream.close()
@@ -0,0 +1,222 @@
+"""Sidecar byte offset indexes for ``data.jsonl`` and ``manager.log``.
+
+Each line written to an indexed file appends a fixed size entry to
+``<file>.idx`` holding the line's byte offset and length, so a reader can seek
+straight to a trial or to a range of session time instead of parsing the
+whole file. The index is written after the line, so after a crash it can at
+worst miss the last line.
+"""
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+import json
+import math
+import mmap
+import os
+import struct
+import zlib
+
+# entries are (offset, length, key, session time)
+# the key of a trial is its trialid
+TRIAL_ENTRY = struct.Struct('<QIqd')
+# the key of a log line is the crc32 of the event name
+LOG_ENTRY = struct.Struct('<QIId')
+
+def index_path(path: str | Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + '.idx')
+
+def event_key(event: str) -> int:
+    return zlib.crc32(event.encode())
+
+def append_indexed(path: str | Path, lines: Sequence[bytes], entries: Sequence[tuple], entry: struct.Struct):
+    """Append encoded lines to a file and an entry per line to its index
+
+    ``entries`` holds the key and time of each line.
+    """
+    with open(path, 'ab') as f:
+        offset = f.tell()
+        f.write(b''.join(lines))
+    append_index(path, offset, lines, entries, entry)
+
+def append_index(path: str | Path, offset: int, lines: Sequence[bytes], entries: Sequence[tuple], entry: struct.Struct):
+    packed = []
+    for line, (key, time) in zip(lines, entries):
+        packed.append(entry.pack(offset, len(line), key, time))
+        offset += len(line)
+    with open(index_path(path), 'ab') as f:
+        f.write(b''.join(packed))
+
+
+class _Column(Sequence):
+    """One field of the entries of an index, for bisect"""
+    def __init__(self, index: "SidecarIndex", field: int):
+        self.index = index
+        self.field = field
+    def __len__(self) -> int:
+        return len(self.index)
+    def __getitem__(self, i):
+        return self.index.entry(i)[self.field]
+
+
+class SidecarIndex:
+    """Random access to the lines of an indexed JSON lines file.
+
+    The index is memory mapped when opened, call ``refresh`` to see lines
+    written since.
+    """
+    ENTRY: struct.Struct
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._index_file = open(index_path(self.path), 'rb')
+        self._map: Optional[mmap.mmap] = None
+        self.refresh()
+
+    def refresh(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        size = os.fstat(self._index_file.fileno()).st_size
+        self._length = size // self.ENTRY.size
+        if self._length:
+            self._map = mmap.mmap(self._index_file.fileno(), self._length * self.ENTRY.size, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def entry(self, i: int) -> tuple:
+        if not 0 <= i < self._length:
+            raise IndexError(i)
+        assert self._map is not None
+        return self.ENTRY.unpack_from(self._map, i * self.ENTRY.size)
+
+    def read(self, offset: int, length: int) -> Dict[str, Any]:
+        self._file.seek(offset)
+        return json.loads(self._file.read(length))
+
+    def time_range(self, start: Optional[float] = None, stop: Optional[float] = None) -> range:
+        """Positions of the entries with start <= time < stop"""
+        times = _Column(self, 3)
+        first = 0 if start is None else bisect_left(times, start)
+        last = len(self) if stop is None else bisect_left(times, stop)
+        return range(first, last)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+        self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrialIndex(SidecarIndex):
+    """Trials of a ``data.jsonl`` file by trialid or session time"""
+    ENTRY = TRIAL_ENTRY
+
+    def position(self, trialid: int) -> int:
+        # trialids normally count up from 0, so try the direct position first
+        if 0 <= trialid < len(self) and self.entry(trialid)[2] == trialid:
+            return trialid
+        i = bisect_left(_Column(self, 2), trialid)
+        if i < len(self) and self.entry(i)[2] == trialid:
+            return i
+        raise KeyError(trialid)
+
+    def trial(self, trialid: int) -> Dict[str, Any]:
+        offset, length, _, _ = self.entry(self.position(trialid))
+        return self.read(offset, length)
+
+    def trials(self, first: Optional[int] = None, last: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Trials with first <= trialid <= last"""
+        ids = _Column(self, 2)
+        start = 0 if first is None else bisect_left(ids, first)
+        stop = len(self) if last is None else bisect_right(ids, last)
+        for i in range(start, stop):
+            offset, length, _, _ = self.entry(i)
+            yield self.read(offset, length)
+
+    def between(self, start: Optional[float] = None, stop: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Trials that started between two session times"""
+        for i in self.time_range(start, stop):
+            offset, length, _, _ = self.entry(i)
+            yield self.read(offset, length)
+
+
+class LogIndex(SidecarIndex):
+    """Events of a ``manager.log`` file by event name and session time
+
+    The positions of the entries of each event are collected in one pass
+    over the index the first time events are selected by name (and again
+    after ``refresh``), so later lookups only read the entries of the
+    requested events.
+    """
+    ENTRY = LOG_ENTRY
+
+    def refresh(self):
+        super().refresh()
+        self._positions: Optional[Dict[int, array]] = None
+
+    def positions(self, event: str) -> array:
+        """Positions in the index of the entries of an event, in order"""
+        if self._positions is None:
+            positions: Dict[int, array] = {}
+            if self._map is not None:
+                for i, (_, _, key, _) in enumerate(self.ENTRY.iter_unpack(self._map)):
+                    if key not in positions:
+                        positions[key] = array('q')
+                    positions[key].append(i)
+            self._positions = positions
+        return self._positions.get(event_key(event), array('q'))
+
+    def events(self, event: Optional[str | Sequence[str]] = None, start: Optional[float] = None, stop: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        selected = self.time_range(start, stop)
+        if event is None:
+            positions: Iterable[int] = selected
+            names = None
+        else:
+            names = {event} if isinstance(event, str) else set(event)
+            found = []
+            for name in names:
+                by_name = self.positions(name)
+                found.extend(by_name[bisect_left(by_name, selected.start):bisect_left(by_name, selected.stop)])
+            positions = sorted(found)
+        for i in positions:
+            offset, length, _, _ = self.entry(i)
+            entry = self.read(offset, length)
+            # crc32 may collide, check the name itself
+            if names is None or entry.get('event') in names:
+                yield entry
+
+
+def build_index(path: str | Path, log: bool = False) -> int:
+    """(Re)build the index of a file written without one, returns the number of lines
+
+    Log lines carry no session time of their own, so their entries get NaN
+    and cannot be selected by time.
+    """
+    path = Path(path)
+    entry = LOG_ENTRY if log else TRIAL_ENTRY
+    packed = []
+    offset = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                data = json.loads(line)
+                if log:
+                    key, time = event_key(data.get('event', '')), math.nan
+                else:
+                    key, time = data.get('trialid', len(packed)), data.get('session_time', math.nan)
+                packed.append(entry.pack(offset, len(line), key, time))
+            offset += len(line)
+    with open(index_path(path), 'wb') as f:
+        f.write(b''.join(packed))
+    return len(packed)
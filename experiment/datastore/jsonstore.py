@@ -1,6 +1,8 @@
 import json 
+import math
 from pathlib import Path
 from experiment.datastore.base import DataStore
+from experiment.datastore.index import TRIAL_ENTRY, append_indexed
 
 class JSONDataStore(DataStore):
     def __init__(self, session_directory):
@@ -8,6 +10,7 @@ class JSONDataStore(DataStore):
         self.key_is_scalar = {}
         self.records = {}
         self.trialid = 0
+        self.streams = {}
     @property
     def json_path(self):
         return self.session_directory / "data.jsonl"
@@ -29,14 +32,17 @@ class JSONDataStore(DataStore):
                 self.key_is_scalar[k] = True
             elif key_state:
                 self.current_trial_record[k] = [self.current_trial_record[k], v]
+                self.key_is_scalar[k] = False
             else:
                 self.current_trial_record[k].append(v)
     def flush(self):
+        self.flush_streams()
         self.key_is_scalar = {}
-        with open(self.json_path, 'a') as f:
-            json.dump(self.current_trial_record, f)
-            f.write("\n")
+        record = self.current_trial_record
+        line = (json.dumps(record) + "\n").encode()
+        # data.jsonl.idx maps trialids to byte offsets, see experiment.datastore.index
+        append_indexed(self.json_path, [line], [(self.trialid, record.get('session_time', math.nan))], TRIAL_ENTRY)
     def close(self):
-        pass
+        self.close_streams()
     def link_attachment(self, name, ftype) -> str:
         ... # Implementation for linking attachments
@@ -0,0 +1,230 @@
+from typing import Any, Dict, List, Optional, Sequence
+from collections import OrderedDict
+from pathlib import Path
+import json
+import queue
+import sqlite3
+import threading
+import warnings
+
+from experiment.datastore.base import DataStore
+
+SQL_TYPES = {bool: 'INTEGER', int: 'INTEGER', float: 'REAL', str: 'TEXT'}
+
+def sql_type(value: Any) -> str:
+    return SQL_TYPES.get(type(value), 'TEXT')
+
+def sql_value(value: Any) -> Any:
+    if value is None or type(value) in SQL_TYPES:
+        return value
+    return json.dumps(value)
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLiteDataStore(DataStore):
+    """Trial data in a SQLite database, ``data.sqlite`` in the session directory.
+
+    Each trial is a row of the ``trials`` table, with a column per recorded
+    key typed by the first value seen (lists and dicts are stored as JSON
+    text). If a key is recorded more than once in a trial the row keeps the
+    first value and every value is kept in order in ``trial_values``.
+
+    ``flush`` hands the finished trial to a writer thread that inserts
+    everything queued in one transaction, so the caller never waits on disk.
+    The database is in WAL mode, so a crash loses at most the trials not yet
+    committed, in practice the one being recorded, and readers can query it
+    while the session runs. Only the last ``history_size`` trials are kept in
+    ``records``. Columns listed in ``indexes`` are indexed when created.
+    """
+    FILENAME = 'data.sqlite'
+
+    def __init__(self,
+            session_directory: Optional[str | Path] = None,
+            history_size: int = 1000,
+            indexes: Sequence[str] = ('block', 'block_number', 'condition', 'outcome'),
+        ):
+        self.trialid = 0
+        self.history_size = history_size
+        self.indexes = set(indexes)
+        self.records: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.key_is_scalar: Dict[str, bool] = {}
+        self.streams = {}
+        self._values: List[tuple[str, Any]] = []
+        self._queue: "queue.Queue[tuple[Dict[str, Any], List[tuple[str, Any]]] | None]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._session_directory: Optional[Path] = None
+        if session_directory is not None:
+            self.session_directory = session_directory
+
+    @property
+    def session_directory(self) -> Optional[Path]:
+        return self._session_directory
+
+    @session_directory.setter
+    def session_directory(self, session_directory: str | Path):
+        # the manager assigns the directory after construction
+        if self._thread is not None:
+            self.close()
+            self.streams = {}
+        self._session_directory = Path(session_directory)
+        self._open()
+
+    @property
+    def db_path(self) -> Path:
+        assert self.session_directory is not None, "SQLiteDataStore has no session directory"
+        return self.session_directory / self.FILENAME
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _open(self):
+        connection = self.connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS trials (trialid INTEGER PRIMARY KEY)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS trial_values ("
+            "trialid INTEGER, key TEXT, idx INTEGER, value, PRIMARY KEY (trialid, key, idx))"
+        )
+        # resume after the last committed trial, e.g. when restarting a crashed session
+        last = connection.execute("SELECT MAX(trialid) FROM trials").fetchone()[0]
+        if last is not None:
+            self.trialid = max(self.trialid, last + 1)
+        self._columns = {row['name'] for row in connection.execute("PRAGMA table_info(trials)")}
+        connection.commit()
+        connection.close()
+        self._thread = threading.Thread(target=self._run, name="SQLiteDataStore", daemon=True)
+        self._thread.start()
+
+    @property
+    def current_trial_record(self) -> Dict[str, Any]:
+        if self.trialid not in self.records:
+            self.records[self.trialid] = {"trialid": self.trialid}
+        return self.records[self.trialid]
+
+    @property
+    def previous_trial_record(self) -> Optional[Dict[str, Any]]:
+        return self.records.get(self.trialid - 1)
+
+    def record(self, **kwargs):
+        record = self.current_trial_record
+        for k, v in kwargs.items():
+            self._values.append((k, v))
+            key_state = self.key_is_scalar.get(k)
+            if key_state is None:
+                record[k] = v
+                self.key_is_scalar[k] = True
+            elif key_state:
+                record[k] = [record[k], v]
+                self.key_is_scalar[k] = False
+            else:
+                record[k].append(v)
+
+    def flush(self):
+        self.flush_streams()
+        record = self.current_trial_record
+        repeated = [k for k, scalar in self.key_is_scalar.items() if not scalar]
+        values = [(k, v) for k, v in self._values if k in repeated]
+        row = {k: (v[0] if k in repeated else v) for k, v in record.items()}
+        self._queue.put((row, values))
+        self.key_is_scalar = {}
+        self._values = []
+        while len(self.records) > self.history_size:
+            self.records.popitem(last=False)
+
+    def _add_columns(self, connection: sqlite3.Connection, row: Dict[str, Any]):
+        for key, value in row.items():
+            if key in self._columns:
+                continue
+            connection.execute(f"ALTER TABLE trials ADD COLUMN {quote(key)} {sql_type(value)}")
+            if key in self.indexes:
+                connection.execute(f"CREATE INDEX IF NOT EXISTS {quote('idx_' + key)} ON trials ({quote(key)})")
+            self._columns.add(key)
+
+    def _write(self, connection: sqlite3.Connection, batch):
+        with connection:
+            for row, values in batch:
+                self._add_columns(connection, row)
+                keys = list(row)
+                connection.execute(
+                    f"INSERT OR REPLACE INTO trials ({', '.join(map(quote, keys))}) "
+                    f"VALUES ({', '.join('?' * len(keys))})",
+                    [sql_value(row[k]) for k in keys]
+                )
+                counts: Dict[str, int] = {}
+                params = []
+                for key, value in values:
+                    idx = counts[key] = counts.get(key, -1) + 1
+                    params.append((row['trialid'], key, idx, sql_value(value)))
+                connection.executemany("INSERT OR REPLACE INTO trial_values VALUES (?, ?, ?, ?)", params)
+
+    def _run(self):
+        connection = self.connect()
+        connection.execute("PRAGMA synchronous=NORMAL")
+        running = True
+        while running:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            # commit whatever else has queued up in the same transaction
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            try:
+                self._write(connection, batch)
+            except sqlite3.Error as e:
+                warnings.warn(f"SQLiteDataStore could not write {len(batch)} trials: {e}")
+        connection.close()
+
+    def close(self):
+        self.close_streams()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def query(self, where: Optional[str] = None, params: Sequence[Any] = (), **equals) -> List[Dict[str, Any]]:
+        """Committed trials, filtered by column values and/or a SQL condition
+
+        e.g. ``query(block=2, outcome='correct')`` or
+        ``query("trialid >= ?", [100])``
+        """
+        clauses, values = [], []
+        for key, value in equals.items():
+            if key not in self._columns:
+                return []
+            clauses.append(f"{quote(key)} = ?")
+            values.append(value)
+        if where is not None:
+            clauses.append(f"({where})")
+            values.extend(params)
+        sql = "SELECT * FROM trials"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY trialid"
+        connection = self.connect()
+        try:
+            return [dict(row) for row in connection.execute(sql, values)]
+        finally:
+            connection.close()
+
+    def values(self, trialid: int, key: str) -> List[Any]:
+        """All values of a key recorded more than once in a trial"""
+        connection = self.connect()
+        try:
+            rows = connection.execute(
+                "SELECT value FROM trial_values WHERE trialid = ? AND key = ? ORDER BY idx", (trialid, key)
+            )
+            return [row['value'] for row in rows]
+        finally:
+            connection.close()
@@ -0,0 +1,118 @@
+from typing import Any, Optional, Tuple
+from pathlib import Path
+import ast
+
+import numpy as np
+
+MAGIC = b'\x93NUMPY\x01\x00'
+
+def header_size(dtype: np.dtype) -> int:
+    """Bytes for a header that fits any stream length, so it can be rewritten in place"""
+    size = len(MAGIC) + 2 + len(header_dict(dtype, 10**19)) + 1
+    return -(-size // 64) * 64
+
+def header_dict(dtype: np.dtype, length: int) -> bytes:
+    return repr({
+        'descr': np.lib.format.dtype_to_descr(dtype),
+        'fortran_order': False,
+        'shape': (length,),
+    }).encode('latin1')
+
+def npy_header(dtype: np.dtype, length: int, size: int) -> bytes:
+    # version 1.0: magic, little endian header length, header padded with spaces ending in a newline
+    body_size = size - len(MAGIC) - 2
+    body = header_dict(dtype, length).ljust(body_size - 1) + b'\n'
+    return MAGIC + body_size.to_bytes(2, 'little') + body
+
+def read_header(path: Path) -> Tuple[np.dtype, int, int]:
+    """dtype, length and data offset of a stream file"""
+    with open(path, 'rb') as f:
+        f.seek(len(MAGIC))
+        size = int.from_bytes(f.read(2), 'little')
+        header = ast.literal_eval(f.read(size).decode('latin1'))
+    return np.lib.format.descr_to_dtype(header['descr']), header['shape'][0], len(MAGIC) + 2 + size
+
+
+class SampleStream:
+    """Typed samples appended into preallocated chunks and spilled to a ``.npy`` file.
+
+    Samples are written to disk whenever a chunk fills up and on ``flush``,
+    the header is updated each time so the file can be read, or memory
+    mapped with ``np.load(path, mmap_mode='r')``, at any point in the
+    session. Memory use stays at one chunk however long the session runs.
+    ``mark`` returns the offset and length of the samples appended since the
+    previous mark, which the datastore records with each trial.
+    """
+    def __init__(self, path: str | Path, dtype: Any, chunk_size: int = 4096):
+        self.path = Path(path)
+        self.dtype = np.dtype(dtype)
+        self.chunk = np.zeros(chunk_size, dtype=self.dtype)
+        self.n_buffered = 0
+        self.mark_offset = 0
+        self.header_size = header_size(self.dtype)
+        if self.path.exists():
+            # continue a stream from an earlier run of the session, dropping unspilled bytes
+            dtype, self.n_written, data_offset = read_header(self.path)
+            if dtype != self.dtype:
+                raise ValueError(f"Stream {self.path} has dtype {dtype}, not {self.dtype}")
+            self.header_size = data_offset
+            self.mark_offset = self.n_written
+            self._file = open(self.path, 'r+b')
+            self._file.truncate(data_offset + self.n_written * self.dtype.itemsize)
+        else:
+            self.n_written = 0
+            self._file = open(self.path, 'w+b')
+            self._file.write(npy_header(self.dtype, 0, self.header_size))
+        self._file.seek(0, 2)
+
+    def __len__(self) -> int:
+        return self.n_written + self.n_buffered
+
+    def append(self, *values):
+        """Append one sample, with a value per field of the dtype"""
+        if self.n_buffered == len(self.chunk):
+            self.spill()
+        self.chunk[self.n_buffered] = values if len(values) > 1 else values[0]
+        self.n_buffered += 1
+
+    def extend(self, samples):
+        """Append an array or sequence of samples"""
+        samples = np.asarray(samples, dtype=self.dtype)
+        while len(samples):
+            if self.n_buffered == len(self.chunk):
+                self.spill()
+            n = min(len(samples), len(self.chunk) - self.n_buffered)
+            self.chunk[self.n_buffered:self.n_buffered + n] = samples[:n]
+            self.n_buffered += n
+            samples = samples[n:]
+
+    def spill(self):
+        if self.n_buffered == 0:
+            return
+        self._file.write(self.chunk[:self.n_buffered].tobytes())
+        self.n_written += self.n_buffered
+        self.n_buffered = 0
+        self._file.seek(0)
+        self._file.write(npy_header(self.dtype, self.n_written, self.header_size))
+        self._file.seek(0, 2)
+        self._file.flush()
+
+    def mark(self) -> Tuple[int, int]:
+        offset = self.mark_offset
+        self.mark_offset = len(self)
+        return offset, self.mark_offset - offset
+
+    def flush(self):
+        self.spill()
+
+    def close(self):
+        if not self._file.closed:
+            self.spill()
+            self._file.close()
+
+
+def load_stream(path: str | Path, offset: int = 0, length: Optional[int] = None, mmap: bool = True) -> np.ndarray:
+    """Samples of a stream file, memory mapped unless ``mmap`` is False"""
+    samples = np.load(path, mmap_mode='r' if mmap else None)
+    stop = None if length is None else offset + length
+    return samples[offset:stop]
@@ -1,16 +1,126 @@
 from flask import Flask, send_file, request, jsonify, render_template
 import threading
+import time
 import io
 import base64
-from typing import Dict, Optional
-from PIL import Image, ImageDraw
-from flask_socketio import SocketIO
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+from PIL import Image, ImageDraw, ImageChops
+from flask_socketio import SocketIO, emit
 
 from experiment.renderers.base import Renderer
 from experiment.events.base import EventManager, Event
 from experiment.util.colours import parse_colour
 
 
+class FramePublisher:
+    """Encodes canvas snapshots on a worker thread and emits binary frames.
+
+    ``submit`` only stores the latest snapshot; the worker publishes at most
+    ``fps`` frames per second and skips snapshots identical to the last one
+    it published. Frames are sent over Socket.IO as ``frame_bin`` events with
+    the encoded bytes as a binary attachment. With ``delta`` enabled only the
+    bounding box of the pixels that changed is encoded and sent, along with
+    its position on the canvas.
+
+    Parameters
+    ----------
+    renderer: FlaskRenderer
+        Renderer whose SocketIO instance frames are emitted on
+    format: str
+        PIL image format, e.g. 'jpeg', 'webp' or 'png'
+    quality: int
+        Encoder quality for lossy formats
+    fps: float
+        Maximum publish rate, independent of the scene frame rate
+    delta: bool
+        Send only the changed region of the canvas
+    """
+    def __init__(self,
+            renderer: "FlaskRenderer",
+            format: str = 'jpeg',
+            quality: int = 80,
+            fps: float = 30,
+            delta: bool = False
+        ):
+        self.renderer = renderer
+        self.format = format.upper()
+        self.quality = quality
+        self.interval = 1 / fps
+        self.delta = delta
+        self.published = 0
+        self.skipped = 0
+        self._pending: Optional[Image.Image] = None
+        self._last: Optional[Image.Image] = None
+        self._keyframe = True
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="FramePublisher", daemon=True)
+        self._thread.start()
+
+    @property
+    def mimetype(self) -> str:
+        return Image.MIME.get(self.format, f"image/{self.format.lower()}")
+
+    def submit(self, snapshot: Image.Image):
+        with self._cond:
+            self._pending = snapshot
+            self._cond.notify()
+
+    def request_keyframe(self):
+        """Publish the next frame in full, e.g. when a client connects"""
+        with self._cond:
+            self._keyframe = True
+            if self._pending is None and self._last is not None:
+                self._pending = self._last
+            self._cond.notify()
+
+    def encode(self, image: Image.Image) -> bytes:
+        bio = io.BytesIO()
+        image.save(bio, format=self.format, quality=self.quality)
+        return bio.getvalue()
+
+    def _run(self):
+        last_publish = 0.
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+            delay = last_publish + self.interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with self._cond:
+                snapshot, self._pending = self._pending, None
+                keyframe, self._keyframe = self._keyframe, False
+            if snapshot is None:
+                continue
+            box = None
+            if self._last is not None and not keyframe:
+                box = ImageChops.difference(snapshot, self._last).getbbox()
+                if box is None:
+                    self.skipped += 1
+                    continue
+                if not self.delta:
+                    box = None
+            last_publish = time.perf_counter()
+            self._last = snapshot
+            region = snapshot.crop(box) if box is not None else snapshot
+            socketio = self.renderer._socketio
+            if socketio is None:
+                continue
+            try:
+                socketio.emit("frame_bin", {
+                    "mimetype": self.mimetype,
+                    "size": snapshot.size,
+                    "box": box,
+                    "data": self.encode(region),
+                })
+                self.published += 1
+            except Exception:
+                # Fail silently; socket might be shutting down
+                pass
+
+
 class FlaskRenderer(Renderer):
     """Renderer that draws onto a PIL image buffer and exposes frames over HTTP.
 
@@ -18,7 +128,12 @@ class FlaskRenderer(Renderer):
     draw_image, clear, flip, get_subject_screen, set_background.
     """
 
-    def __init__(self, size=(800, 600), background=(155, 155, 155), socketio: Optional[SocketIO] = None):
+    def __init__(self, 
+            size=(800, 600), 
+            background=(155, 155, 155), 
+            socketio: Optional[SocketIO] = None, 
+            publish_params: Optional[Dict[str, Any]] = None
+        ):
         self.size = tuple(size)
         self.default_background = parse_colour(background)
         self.background = self.default_background
@@ -27,11 +142,23 @@ class FlaskRenderer(Renderer):
         self._last_frame_bytes: Optional[bytes] = None
 
         # Backing canvas and draw object
-        self._canvas = Image.new("RGB", self.size, self.background)
+        self._canvas = Image.new("RGB", self.size, tuple(self.background))
         self._draw = ImageDraw.Draw(self._canvas)
         # Optional SocketIO instance to broadcast frames
         self._socketio = socketio
 
+        # In async mode flip() only snapshots the canvas and a worker thread
+        # encodes and publishes binary frames
+        self._last_snapshot: Optional[Image.Image] = None
+        self._publisher: Optional[FramePublisher] = None
+        if publish_params is not None:
+            publish_params = dict(publish_params)
+            mode = publish_params.pop('mode', 'sync')
+            if mode == 'async':
+                self._publisher = FramePublisher(self, **publish_params)
+            elif mode != 'sync':
+                raise ValueError(f"Unsupported publish mode: {mode}")
+
     def initialize(self):
         # No special initialization required for this renderer
         return None
@@ -40,14 +167,14 @@ class FlaskRenderer(Renderer):
         # adapter.rect is expected to be (x, y, w, h) or box-like
         x, y, w, h = adapter.rect
         box = (x, y, x + w, y + h)
-        self._draw.rectangle(box, fill=adapter.colour)
+        self._draw.rectangle(box, fill=tuple(adapter.colour))
 
     def draw_circle(self, adapter):
         # adapter.position (x, y) and adapter.size is radius
         x, y = adapter.position
         r = adapter.size
         box = (x - r, y - r, x + r, y + r)
-        self._draw.ellipse(box, fill=adapter.colour)
+        self._draw.ellipse(box, fill=tuple(adapter.colour))
 
     def draw_image(self, adapter):
         # adapter.image is expected to be a PIL.Image-like object
@@ -58,7 +185,7 @@ class FlaskRenderer(Renderer):
         self._canvas.paste(image, adapter.top_left)
 
     def clear(self):
-        self._draw.rectangle((0, 0, self.size[0], self.size[1]), fill=self.background)
+        self._draw.rectangle((0, 0, self.size[0], self.size[1]), fill=tuple(self.background))
 
     def set_background(self, colour: Optional[str | tuple] = None):
         if colour is None:
@@ -71,7 +198,23 @@ class FlaskRenderer(Renderer):
         """Attach a SocketIO instance so `flip()` can broadcast frames."""
         self._socketio = socketio
 
+    @property
+    def publishes_async(self) -> bool:
+        return self._publisher is not None
+
+    def request_keyframe(self):
+        if self._publisher is not None:
+            self._publisher.request_keyframe()
+
     def flip(self):
+        if self._publisher is not None:
+            snapshot = self._canvas.copy()
+            with self._frame_ready:
+                self._last_snapshot = snapshot
+                self._last_frame_bytes = None
+                self._frame_ready.notify_all()
+            self._publisher.submit(snapshot)
+            return
         # Convert current canvas to bytes (PNG) and notify waiting threads
         with self._frame_ready:
             bio = io.BytesIO()
@@ -92,12 +235,149 @@ class FlaskRenderer(Renderer):
     def get_subject_screen(self) -> Optional[bytes]:
         # Return the last flipped frame bytes
         with self._frame_ready:
-            if self._last_frame_bytes is None:
-                # If no flipped frame yet, create one from current canvas
-                bio = io.BytesIO()
-                self._canvas.save(bio, format="PNG")
-                return bio.getvalue()
-            return self._last_frame_bytes
+            if self._last_frame_bytes is not None:
+                return self._last_frame_bytes
+            snapshot = self._last_snapshot
+        # In async mode the last snapshot is encoded lazily, outside the lock
+        # so that flip() is never kept waiting on the encoder
+        if snapshot is not None:
+            bio = io.BytesIO()
+            snapshot.save(bio, format="PNG")
+            with self._frame_ready:
+                if self._last_snapshot is snapshot:
+                    self._last_frame_bytes = bio.getvalue()
+            return bio.getvalue()
+        # If no flipped frame yet, create one from current canvas
+        with self._frame_ready:
+            bio = io.BytesIO()
+            self._canvas.save(bio, format="PNG")
+            return bio.getvalue()
+
+
+class DisplayListRenderer(Renderer):
+    """Renderer that sends a per-frame display list for the browser to draw.
+
+    Instead of rasterising on the server, every draw call appends a compact
+    command to the frame's display list::
+
+        ["rect", adapter_id, x, y, w, h, colour]
+        ["circle", adapter_id, x, y, radius, colour]
+        ["image", adapter_id, asset_hash, x, y, w, h, orientation]
+
+    ``flip`` emits the list as a ``display_list`` Socket.IO event, unless it
+    is identical to the previous frame. Images are uploaded once as ``asset``
+    events (PNG bytes keyed by content hash) and afterwards only referenced
+    by hash. At most ``max_assets`` assets are kept for late joining clients.
+    """
+
+    def __init__(self, size=(800, 600), background=(155, 155, 155), socketio: Optional[SocketIO] = None, max_assets: int = 256):
+        self.size = tuple(size)
+        self.default_background = parse_colour(background)
+        self.background = self.default_background
+        self.max_assets = max_assets
+        self._socketio = socketio
+        self._frame_ready = threading.Condition()
+        self._commands: List[list] = []
+        self._last_display_list: Optional[Dict[str, Any]] = None
+        self._seq = 0
+        # asset hash -> PNG bytes, and image id -> (image, version, hash)
+        self._assets: OrderedDict[str, bytes] = OrderedDict()
+        self._image_hashes: Dict[int, tuple] = {}
+
+    def initialize(self):
+        return None
+
+    def set_socketio(self, socketio: SocketIO):
+        self._socketio = socketio
+
+    def draw_rect(self, adapter):
+        x, y, w, h = adapter.rect
+        self._commands.append(["rect", id(adapter), x, y, w, h, list(adapter.colour)])
+
+    def draw_circle(self, adapter):
+        x, y = adapter.position
+        self._commands.append(["circle", id(adapter), x, y, adapter.size, list(adapter.colour)])
+
+    def draw_image(self, adapter):
+        asset = self.get_asset(adapter)
+        x, y = adapter.top_left
+        w, h = adapter.size
+        self._commands.append(["image", id(adapter), asset, x, y, w, h, adapter.orientation])
+
+    def get_asset(self, adapter) -> str:
+        image = adapter.image
+        version = getattr(adapter, 'image_version', 0)
+        cached = self._image_hashes.get(id(image))
+        # the cached entry holds the image, so its id cannot have been reused
+        if cached is not None and cached[1] == version and cached[2] in self._assets:
+            self._assets.move_to_end(cached[2])
+            return cached[2]
+        digest = hashlib.sha1(
+            f"{image.mode}{image.size}".encode() + image.tobytes()
+        ).hexdigest()
+        self._image_hashes[id(image)] = (image, version, digest)
+        if digest not in self._assets:
+            bio = io.BytesIO()
+            image.save(bio, format="PNG")
+            self._assets[digest] = bio.getvalue()
+            self.emit_asset(digest)
+            while len(self._assets) > self.max_assets:
+                evicted, _ = self._assets.popitem(last=False)
+                self._image_hashes = {
+                    key: value for key, value in self._image_hashes.items() if value[2] != evicted
+                }
+        self._assets.move_to_end(digest)
+        return digest
+
+    def emit_asset(self, digest: str):
+        if self._socketio is None:
+            return
+        try:
+            self._socketio.emit("asset", {"hash": digest, "mimetype": "image/png", "data": self._assets[digest]})
+        except Exception:
+            pass
+
+    def clear(self):
+        self._commands = []
+
+    def set_background(self, colour: Optional[str | tuple] = None):
+        if colour is None:
+            colour = self.default_background
+        self.background = parse_colour(colour)
+        self.clear()
+        self.flip()
+
+    def flip(self):
+        commands, self._commands = self._commands, []
+        last = self._last_display_list
+        if last is not None and last["commands"] == commands and last["background"] == list(self.background):
+            return
+        self._seq += 1
+        display_list = {
+            "seq": self._seq,
+            "size": self.size,
+            "background": list(self.background),
+            "commands": commands,
+        }
+        with self._frame_ready:
+            self._last_display_list = display_list
+            self._frame_ready.notify_all()
+        if self._socketio is not None:
+            try:
+                self._socketio.emit("display_list", display_list)
+            except Exception:
+                pass
+
+    def get_display_list(self) -> Optional[Dict[str, Any]]:
+        with self._frame_ready:
+            return self._last_display_list
+
+    def get_assets(self) -> Dict[str, bytes]:
+        return dict(self._assets)
+
+    def get_subject_screen(self) -> Optional[bytes]:
+        # Frames are drawn client side, there is no raster to return
+        return None
 
 
 class FlaskEventManager(EventManager):
@@ -111,6 +391,10 @@ class FlaskEventManager(EventManager):
         self._lock = threading.Lock()
 
     def post_event(self, event: dict):
+        # browser timestamps are on the client's clock, stamp arrival on the session clock
+        if 'time' in event:
+            event['client_time'] = event.pop('time')
+        event['time'] = self.manager.get_time()
         with self._lock:
             print(event)
             self._queue.append(event)
@@ -126,6 +410,7 @@ class FlaskEventManager(EventManager):
                 converted.append(e)
             else:
                 converted.append(e)
+        self.log_events(converted)
         return converted
 
 from experiment.manager import Manager
@@ -140,15 +425,26 @@ class FlaskManager(Manager):
         size = display_settings.get("size", (800, 600))
         background = config.get("background", (155, 155, 155))
 
-        renderer = FlaskRenderer(
-            size=size,
-            background=background,
-        )
+        self.render_mode = render_settings.get("mode", "raster")
+        if self.render_mode == "raster":
+            renderer = FlaskRenderer(
+                size=size,
+                background=background,
+                publish_params=render_settings.get("publish"),
+            )
+        elif self.render_mode == "display_list":
+            renderer = DisplayListRenderer(
+                size=size,
+                background=background,
+                max_assets=render_settings.get("max_assets", 256),
+            )
+        else:
+            raise ValueError(f"Unsupported render mode: {self.render_mode}")
         eventmanager = FlaskEventManager(manager=self)
         super().__init__(config=config, renderer=renderer, eventmanager=eventmanager, **kwargs)
         self.host = host
         self.port = port
-        assert isinstance(self.renderer, FlaskRenderer)
+        assert isinstance(self.renderer, (FlaskRenderer, DisplayListRenderer))
 
         # Create Flask app + SocketIO
         self.app = Flask(__name__, static_folder=None, template_folder="templates")
@@ -163,6 +459,8 @@ class FlaskManager(Manager):
 
         @self.app.route("/")
         def index():
+            if self.render_mode == "display_list":
+                return render_template('display_list.html')
             return render_template('index.html')
 
         @self.app.route("/frame")
@@ -191,6 +489,18 @@ class FlaskManager(Manager):
         # SocketIO handlers
         @self.socketio.on("connect")
         def _on_connect():
+            # Send the connecting client every asset and the current frame
+            if isinstance(self.renderer, DisplayListRenderer):
+                for digest, data in self.renderer.get_assets().items():
+                    emit("asset", {"hash": digest, "mimetype": "image/png", "data": data})
+                display_list = self.renderer.get_display_list()
+                if display_list is not None:
+                    emit("display_list", display_list)
+                return
+            # Frames are pushed in async mode, make sure the next one is complete
+            if self.renderer.publishes_async:
+                self.renderer.request_keyframe()
+                return
             # Optionally send initial frame on connect
             try:
                 frame_bytes = self.renderer.get_subject_screen()
@@ -202,6 +512,9 @@ class FlaskManager(Manager):
 
         @self.socketio.on("request_frame")
         def _on_request_frame():
+            if not isinstance(self.renderer, FlaskRenderer) or self.renderer.publishes_async:
+                # frames are pushed as they are published
+                return
             frame_bytes = self.renderer.get_subject_screen()
             if frame_bytes:
                 b64 = base64.b64encode(frame_bytes).decode("ascii")
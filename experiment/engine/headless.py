@@ -0,0 +1,80 @@
+from typing import Any, Callable, Dict, Literal, overload
+from experiment.manager import Manager
+from experiment.renderers.null import NullRenderer
+from experiment.events.scripted import ScriptedEventManager
+from experiment.io.base import PulseTrain
+from experiment.util.clock import VirtualClock
+from experiment.util.pacing import VirtualFramePacer
+
+class HeadlessManager(Manager):
+    """Runs a session without a display, as fast as the task logic allows.
+
+    Time comes from a VirtualClock that the frame loop advances by exactly
+    one frame per iteration, so TimeCounters and ITIs complete without
+    waiting. Input is scripted through the ``input.script`` config list of
+    events with session ``time`` stamps. Hardware sections of the config
+    (io, markers, remote server) are ignored; rewards are logged and kept
+    in ``rewards`` instead of being delivered.
+
+    ``headless.max_duration`` (session seconds) and ``headless.max_trials``
+    end the session once reached.
+    """
+    def __init__(self, data_directory, config, **kwargs):
+        display_params = config.pop('display', {})
+        background = config.pop('background', None)
+        input_params = config.pop('input', {})
+        headless_params = config.pop('headless', {})
+        for section in ('io', 'markers', 'frame_capture'):
+            config.pop(section, None)
+        config['remote_server'] = {'enabled': False}
+        config['remote'] = False
+        self.max_duration = headless_params.get('max_duration')
+        self.max_trials = headless_params.get('max_trials')
+        self.rewards: list[PulseTrain] = []
+        super().__init__(
+            data_directory=data_directory,
+            renderer=NullRenderer(display_params.get('size', (800, 600)), background),
+            eventmanager=ScriptedEventManager(self, input_params.get('script', [])),
+            config=config,
+            taskmanager=None,
+            clock=VirtualClock(),
+            **kwargs
+        )
+        self.renderer.initialize()
+        self.detect_frame_duration()
+        self.eventmanager.start()
+
+    def create_frame_pacer(self) -> VirtualFramePacer:
+        return VirtualFramePacer(self.frame_duration, self.clock)
+
+    @overload
+    def good_monkey(self, return_callbacks: Literal[True], **kwargs) -> Dict[str, Callable]: ...
+    @overload
+    def good_monkey(self, return_callbacks: Literal[False] = False, **kwargs) -> PulseTrain | None: ...
+
+    def good_monkey(self, return_callbacks: bool = False, **kwargs) -> PulseTrain | None | Dict[str, Callable]:
+        """Record the reward without delivering it"""
+        if return_callbacks:
+            return {
+                'reward_setup_callback': lambda: None,
+                'reward_on_callback': lambda: None,
+                'reward_off_callback': lambda: None,
+            }
+        kwargs.pop('block', None)
+        kwargs.pop('policy', None)
+        train = PulseTrain(**kwargs)
+        now = self.get_time()
+        train.pulses.append((now, now + (train.duration or 0.) * train.n_pulses))
+        train.done.set()
+        self.rewards.append(train)
+        self.behaviour_summary.add_reward(train)
+        self.logger.log_event("Reward", {"state": "virtual", "time": now, "duration": train.duration, "n_pulses": train.n_pulses})
+        return train
+
+    def run_trial(self, trial):
+        result = super().run_trial(trial)
+        if self.max_trials is not None and self.datastore.trialid >= self.max_trials:
+            result.continue_session = False
+        if self.max_duration is not None and self.get_time() >= self.max_duration:
+            result.continue_session = False
+        return result
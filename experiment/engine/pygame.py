@@ -1,4 +1,4 @@
-from experiment.manager import Manager, Logger
+from experiment.manager import Manager
 from experiment.renderers.pygame import PygameRenderer
 from experiment.events.pygame import PygameEventManager
 
@@ -6,16 +6,20 @@ class PygameManager(Manager):
     def __init__(self, data_directory, config, **kwargs):
         display_params = config.pop('display')
         background = config.pop('background', None)
+        capture_params = config.pop('frame_capture', None)
+        input_params = config.pop('input', {})
         super().__init__(
             data_directory=data_directory,
-            renderer=PygameRenderer(display_params, background),
-            logger=Logger(),
-            eventmanager=PygameEventManager(self),
+            renderer=PygameRenderer(display_params, background, capture_params),
+            eventmanager=PygameEventManager(self, **input_params),
             config=config,
             taskmanager=None,
             **kwargs
         )
         self.renderer.initialize()
+        self.detect_frame_duration()
+        self.eventmanager.start()
+        self.start_remote_server()
 
 if __name__ == '__main__':
     from experiment.experiments.adapters.TimeCounter import TimeCounter
@@ -5,10 +5,20 @@ class EventManager:
     def __init__(self, manager: "Manager"):
         self.manager = manager
         self.event_queue = []
+    def start(self):
+        pass
+    def close(self):
+        pass
     def post_event(self, event: Event):
         if event.get('time') is None:
             event['time'] = self.manager.get_time()
         self.event_queue.append(event)
+    def log_events(self, events: Sequence[Event]):
+        """Stamp events with the scene and frame they are delivered on and log them"""
+        for event in events:
+            event['scene'] = self.manager.scene_index
+            event['frame'] = self.manager.frame_index
+            self.manager.logger.log_event('event', event)
     def get_events(self) -> Sequence[Event]:
         events = self.event_queue.copy()
         self.event_queue.clear()
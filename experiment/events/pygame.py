@@ -1,49 +1,124 @@
 from collections.abc import Sequence
+from collections import deque
+from typing import Optional
+import threading
+import time
+import warnings
 import pygame
 from experiment.events import EventManager, Event
 
 class PygameEventManager(EventManager):
-    def get_events(self) -> Sequence[Event]:
-        event_stack = super().get_events()
+    """Event manager reading input from the pygame event queue.
+
+    In the default 'frame' mode the queue is drained once per frame by
+    ``get_events``. In 'threaded' mode a polling thread drains it
+    ``poll_rate`` times per second into a ring buffer of ``buffer_size``
+    events and ``get_events`` hands the frame loop everything collected since
+    the previous frame, so no motion samples are lost and each event keeps
+    its own position. Pumping events off the main thread is only reliable
+    with video drivers that allow it (X11, KMS/DRM, dummy).
+
+    pygame events carry no timestamp, so each event is stamped with the
+    session time at which it was taken off the SDL queue, as ``time`` and
+    ``poll_time``. In 'frame' mode that is once per frame, so reaction times
+    are quantised to the frame; in 'threaded' mode they are resolved to the
+    polling interval.
+    """
+    MODES = ('frame', 'threaded')
+
+    def __init__(self, manager: "Manager", mode: str = 'frame', poll_rate: float = 1000, buffer_size: int = 4096):
+        super().__init__(manager)
+        if mode not in self.MODES:
+            raise ValueError(f"Unsupported input mode: {mode}")
+        self.mode = mode
+        self.poll_interval = 1 / poll_rate
+        self.buffer: deque[Event] = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.mode == 'threaded' and not self._running:
+            self._running = True
+            self._thread = threading.Thread(target=self._poll, name="PygameEventPoller", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        if self._running:
+            self._running = False
+            self._thread.join()
+        if self.dropped:
+            warnings.warn(f"PygameEventManager dropped {self.dropped} events due to a full buffer")
+
+    def convert(self, pg_event: pygame.event.Event, poll_time: float) -> Optional[Event]:
+        event = {'time': poll_time, 'poll_time': poll_time}
+        if pg_event.type == pygame.MOUSEBUTTONDOWN:
+            mouseX, mouseY = pg_event.pos
+            event.update(
+                type="mouse_down",
+                x=mouseX,
+                y=mouseY,
+            )
+        elif pg_event.type == pygame.MOUSEBUTTONUP:
+            mouseX, mouseY = pg_event.pos
+            event.update(
+                type="mouse_up",
+                x=mouseX,
+                y=mouseY,
+            )
+        elif pg_event.type == pygame.MOUSEMOTION:
+            mouseX, mouseY = pg_event.pos
+            event.update(x=mouseX, y=mouseY)
+            if pg_event.buttons[0]:
+                event['type'] = 'mouse_drag'
+            else:
+                event['type'] = 'mouse_move'
+        elif pg_event.type == pygame.QUIT:
+            event.update(type="QUIT", do="quit")
+        elif pg_event.type == pygame.KEYDOWN:
+            key_name = pygame.key.name(pg_event.key)
+            if key_name in self.manager.hotkeys:
+                action = self.manager.hotkeys[key_name]
+                event.update(type="key_down", key=key_name, **action)
+            else:
+                event.update(type="key_down", key=key_name)
+        else:
+            return None
+        return event
+
+    def drain(self) -> list[Event]:
+        """Convert everything waiting on the SDL queue"""
+        poll_time = self.manager.get_time()
+        events = []
         for pg_event in pygame.event.get():
-            event = {}
-            event['time'] = pg_event.dict.get('timestamp', pygame.time.get_ticks())
-            numbers = [
-                pygame.K_1, pygame.K_3, pygame.K_5
-            ] 
-            if pg_event.type == pygame.MOUSEBUTTONDOWN:
-                mouseX, mouseY = pygame.mouse.get_pos()
-                event.update(
-                    type="mouse_down",
-                    x=mouseX,
-                    y=mouseY,
-                )
-            elif pg_event.type == pygame.MOUSEBUTTONUP:
-                mouseX, mouseY = pygame.mouse.get_pos()
-                event.update(
-                    type="mouse_up",
-                    x=mouseX,
-                    y=mouseY,
-                )
-            elif pg_event.type == pygame.MOUSEMOTION:
-                mouseX, mouseY = pygame.mouse.get_pos()
-                event.update(x=mouseX, y=mouseY)
-                if pg_event.buttons[0]:
-                    event['type'] = 'mouse_drag'
-                else:
-                    event['type'] = 'mouse_move'
-            elif pg_event.type == pygame.QUIT:
-                event.update(type="QUIT", do="quit")
-            elif pg_event.type == pygame.KEYDOWN:
-                key_name = pygame.key.name(pg_event.key)
-                if key_name in self.manager.hotkeys:
-                    action = self.manager.hotkeys[key_name]
-                    event.update(type="key_down", key=key_name, **action)
-                else:
-                    event.update(type="key_down", key=key_name)
+            event = self.convert(pg_event, poll_time)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _poll(self):
+        next_poll = time.perf_counter()
+        while self._running:
+            for event in self.drain():
+                if len(self.buffer) == self.buffer.maxlen:
+                    self.dropped += 1
+                self.buffer.append(event)
+            next_poll += self.poll_interval
+            delay = next_poll - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
             else:
-                continue
-            event_stack.append(event)
-        for event in event_stack:
-            self.manager.logger.log_event('event', event)
+                # fell behind, do not try to catch up with a burst of polls
+                next_poll = time.perf_counter()
+
+    def get_events(self) -> Sequence[Event]:
+        event_stack = super().get_events()
+        if self.mode == 'threaded':
+            # popleft is atomic, so this is safe against the polling thread
+            buffer = self.buffer
+            while buffer:
+                event_stack.append(buffer.popleft())
+        else:
+            event_stack.extend(self.drain())
+        self.log_events(event_stack)
         return event_stack
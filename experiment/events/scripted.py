@@ -0,0 +1,32 @@
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, List
+import heapq
+import itertools
+from experiment.events import EventManager, Event
+
+class ScriptedEventManager(EventManager):
+    """Event manager that injects a script of events at given session times.
+
+    Each scripted event is a dict with a ``time`` in seconds of session time;
+    it is delivered by the first ``get_events`` call at or after that time.
+    Events posted with ``post_event`` are delivered as usual.
+    """
+    def __init__(self, manager: "Manager", script: Iterable[Dict[str, Any]] = ()):
+        super().__init__(manager)
+        self._script: List[tuple[float, int, Event]] = []
+        # tie breaker so events at the same time keep their order
+        self._counter = itertools.count()
+        for event in script:
+            self.schedule(event)
+
+    def schedule(self, event: Event):
+        event = dict(event)
+        heapq.heappush(self._script, (event['time'], next(self._counter), event))
+
+    def get_events(self) -> Sequence[Event]:
+        event_stack = super().get_events()
+        now = self.manager.get_time()
+        while self._script and self._script[0][0] <= now:
+            event_stack.append(heapq.heappop(self._script)[2])
+        self.log_events(event_stack)
+        return event_stack
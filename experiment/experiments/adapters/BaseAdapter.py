@@ -8,6 +8,8 @@ class BaseAdapter:
         self.children = children
         self.elapsed = 0.
         self.lifetimes = []
+        # event codes waiting to be picked up by the scene
+        self.event_codes: list[int] = []
 
     def start(self):
         self.active = True 
@@ -28,7 +30,23 @@ class BaseAdapter:
         for child in self.children:
             child.render(renderer)
 
+    def emit_code(self, code: int):
+        """Send an event code with the next displayed frame"""
+        self.event_codes.append(code)
+
+    def collect_codes(self) -> list[int]:
+        """Return and clear the pending event codes of this adapter and its children"""
+        codes = self.event_codes
+        if codes:
+            self.event_codes = []
+        for child in self.children:
+            child_codes = child.collect_codes()
+            if child_codes:
+                codes = codes + child_codes
+        return codes
+
     def reset(self):
+        self.event_codes = []
         self.lifetimes.append(self.elapsed)
         self.elapsed = 0.
         self.active = False
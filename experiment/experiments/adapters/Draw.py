@@ -30,6 +30,9 @@ class DrawAdapter(BaseAdapter):
         super().__init__(children=[canvas, self.time_counter])
         self.canvas = canvas
         self.canvas_backup = canvas.image.copy()
+        # draw on a private copy, the original may be shared through the image cache
+        self.canvas.image = self.canvas_backup.copy()
+        self._drawn = None
 
         self.state = 'init'
         self.pen_radius = pen_radius
@@ -45,6 +48,7 @@ class DrawAdapter(BaseAdapter):
             (x-self.pen_radius, y-self.pen_radius, x+self.pen_radius, y+self.pen_radius),
             fill=self.pen_colour
         )
+        self.canvas.invalidate()
         return self.canvas.image
 
     def draw(self, path):
@@ -55,11 +59,21 @@ class DrawAdapter(BaseAdapter):
             width=self.pen_radius*2,
             joint='curve'
         )
+        self.canvas.invalidate()
         return self.canvas.image
 
     def render(self, renderer):
         super().render(renderer)
-        self.canvas.image = self.canvas_backup.copy()
+        # strokes only grow, so only repaint when a stroke or point was added
+        drawn = (
+            len(self.strokes), 
+            self.last_stroke.path_length if self.last_stroke is not None else 0
+        )
+        if drawn == self._drawn:
+            return
+        self._drawn = drawn
+        self.canvas.image.paste(self.canvas_backup)
+        self.canvas.invalidate()
         for stroke in self.strokes:
             if stroke.path_length > 0:
                 self.draw(stroke.path)
@@ -111,7 +125,8 @@ class DrawAdapter(BaseAdapter):
 
     def reset(self):
         super().reset()
-        self.canvas.image = self.canvas_backup
+        self.canvas.image = self.canvas_backup.copy()
+        self._drawn = None
         if self.last_stroke is not None:
             self.strokes.append(self.last_stroke)
             self.last_stroke = None
@@ -22,10 +22,19 @@ class TouchAdapter(BaseAdapter):
         self.chosen = None
         self.state = 'init'
 
+    def set_state(self, state: str):
+        self.state = state
+        self.emit_event_code(state)
+
+    def emit_event_code(self, key: str):
+        """Emit the code mapped to an item name or state, if there is one"""
+        if self.event_code_map is not None and key in self.event_code_map:
+            self.emit_code(self.event_code_map[key])
+
     def update(self, tick: float, events: Sequence["Event"]) -> bool:
         super().update(tick, events)
         if not self.time_counter.active:
-            self.state = 'elapsed'
+            self.set_state('elapsed')
             self.active = False
             return self.active
         
@@ -35,12 +44,12 @@ class TouchAdapter(BaseAdapter):
         touch_outside = True # guilty until proven innocent
         for name, item in self.items.items():
             if item.was_touched:
-                # log the touch
                 # if event codes are provided, fire one off now
+                self.emit_event_code(name)
                 if self.targets is None or name in self.targets:
                     # we have made a "correct" touch
                     # we will stop
-                    self.state = 'correct'
+                    self.set_state('correct')
                     self.chosen = name
                     self.active = False
                     touch_outside = False
@@ -52,7 +61,7 @@ class TouchAdapter(BaseAdapter):
                 else:
                     # we have made an incorrect touch
                     # and this is not permitted, we will stop
-                    self.state = 'incorrect'
+                    self.set_state('incorrect')
                     self.chosen = name
                     self.active = False
                     touch_outside = False
@@ -60,6 +69,6 @@ class TouchAdapter(BaseAdapter):
         # if any events are unconsumed, the touch fell out
         if touch_outside and not self.allow_outside_touch:
             # if so, and allow_outside_touch is false, end otherwise continuepass
-            self.state = 'outside'
+            self.set_state('outside')
             self.active = False
         return self.active
@@ -24,6 +24,9 @@ def load_and_cache_image(image: PathLike[bytes]) -> Image.Image:
 
 
 class ImageAdapter(GraphicAdapter):
+    # incremented whenever the image is replaced or modified in place so
+    # renderers can invalidate anything they derived from it
+    image_version: int = 0
     def __init__(self, 
         image,
         position: Sequence[float], 
@@ -37,11 +40,21 @@ class ImageAdapter(GraphicAdapter):
             image_path = Path(image)
             image = load_and_cache_image(image_path)
 
-        self.image: Image.Image = image
+        self.image = image
         self.position = position
         self.size = size
         self.orientation = orientation
     @property
+    def image(self) -> Image.Image:
+        return self._image
+    @image.setter
+    def image(self, image: Image.Image):
+        self._image = image
+        self.invalidate()
+    def invalidate(self):
+        """Mark the image as changed, call after drawing on it in place"""
+        self.image_version += 1
+    @property
     def top_left(self):
         x, y = self.position
         w, h = self.size
@@ -1,5 +1,4 @@
 from typing import Optional, Sequence, TYPE_CHECKING
-import time
 from experiment.experiments.adapters.BaseAdapter import BaseAdapter
 import warnings
 if TYPE_CHECKING:
@@ -11,10 +10,14 @@ class Scene:
             adapter: BaseAdapter, 
             event: Optional[int] = None, 
             aux_adapters: Optional[Sequence[BaseAdapter]] = None,
-            background: Optional[str | Sequence[int]] = None
+            background: Optional[str | Sequence[int]] = None,
+            name: Optional[str] = None
         ):
         self.manager = manager
         self.adapter = adapter
+        if name is None:
+            name = type(adapter).__name__
+        self.name = name
         self.event = event
         self.background = background
         if aux_adapters is None:
@@ -22,21 +25,26 @@ class Scene:
         self.aux_adapters = aux_adapters
         self.quit = False
     def run(self):
-        #fire off the event at the start of the scene
+        #fire off the event with the first frame of the scene
         if self.event is not None:
-            raise NotImplementedError()
+            self.manager.send_marker(self.event, source=self.name)
+        markers = self.manager.markers
 
         for adapter in [self.adapter] + self.aux_adapters:
             adapter.start()
-        frame_start_time = time.time()
+        parent_scene, self.manager.scene = self.manager.scene, self
+        self.manager.scene_index += 1
+        timing = self.manager.frame_timing.start_scene(self.name, self.manager.frame_duration)
         self.manager.renderer.set_background(self.background)
+        pacer = self.manager.create_frame_pacer()
         while True:
-            last_frame_start_time = frame_start_time
-            frame_start_time = time.time()
-            tick = frame_start_time - last_frame_start_time
+            timing.begin_frame()
+            tick = pacer.tick
+            self.manager.frame_index = pacer.frame
 
             # get events from the event manager
             events = self.manager.eventmanager.get_events()
+            timing.mark('events')
             for event in events:
                 action = event.get('do')
                 if action is None:
@@ -48,37 +56,54 @@ class Scene:
                         raise ValueError(f"Unregistered action '{action}' called in scene '{self}'")
                     else:
                         warnings.warn(f"Unregistered action '{action}' called in scene '{self}'")
+            timing.mark('actions')
 
             # wipe the screen
             self.manager.renderer.clear()
+            timing.mark('render')
             # update and render the main adapter
             self.adapter.update(tick, events)
+            timing.mark('update')
             self.adapter.render(self.manager.renderer)
+            timing.mark('render')
             # update and render auxiliary adapters
             active_aux_adapters = [adapter for adapter in self.aux_adapters if adapter.active]
             for adapter in active_aux_adapters:
                 adapter.update(tick, events)
+            timing.mark('update')
             for adapter in active_aux_adapters:
                 adapter.render(self.manager.renderer)
+            timing.mark('render')
+            # codes raised by adapters go out with the frame that shows their result
+            if markers is not None:
+                for adapter in [self.adapter] + active_aux_adapters:
+                    for code in adapter.collect_codes():
+                        markers.schedule(code, self.name)
             # update display
             self.manager.renderer.flip()
+            if markers is not None:
+                markers.on_flip(self.manager.get_time())
+            timing.mark('flip')
 
             # manage frame timing
-            render_time = time.time() - frame_start_time
-            if render_time > self.manager.frame_duration:
+            render_time = timing.elapsed()
+            missed = pacer.wait()
+            if missed:
                 self.manager.logger.log_event(
                     "FrameDelay",
                     {
                         "render_time": render_time,
+                        "missed_frames": missed,
                         "scene": str(self)
                     }
                 )
-            else:
-                #TODO: implement sync/async waiting for next frame?
-                time.sleep(self.manager.frame_duration - render_time)
+            timing.mark('sleep')
+            timing.end_frame()
 
             if self.quit or not self.adapter.active:
                 break
+        self.manager.frame_timing.end_scene(timing)
+        self.manager.scene = parent_scene
 
         # if the scene reaches conclusion
         # reset the adapters in the chain
@@ -4,7 +4,8 @@ import RPi.GPIO as GPIO
 from experiment.io.base import IOInterface
 
 class RPi_IOInterface(IOInterface):
-    def __init__(self):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
         GPIO.setmode(GPIO.BOARD)
         GPIO.setwarnings(False)
 
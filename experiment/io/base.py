@@ -1,27 +1,199 @@
+from typing import Any, Callable, Dict, Optional, Sequence
+from dataclasses import dataclass, field
+import threading
 import time
+import queue
+
+@dataclass
+class PulseTrain:
+    duration: float
+    n_pulses: int = 1
+    interpulse_interval: Optional[float] = None
+    channels: Optional[Sequence[Any]] = None
+    speed: Optional[float] = None
+    cancelled: bool = False
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+    # actual (on, off) times of each delivered pulse
+    pulses: list = field(default_factory=list)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the train has been delivered or cancelled"""
+        return self.done.wait(timeout)
+
+
+class RewardScheduler:
+    """Delivers reward pulse trains on a dedicated thread.
+
+    Pulse on/off commands are issued against absolute ``time.perf_counter``
+    deadlines measured from the start of the train, so callback latency does
+    not accumulate across pulses. The queueing policy decides what happens
+    when a train is submitted while another is being delivered:
+
+    - 'queue': deliver it after the trains already waiting
+    - 'replace': cancel the current and waiting trains and deliver it now
+    - 'drop': ignore it
+
+    Actual on/off times are logged as ``Reward`` events if the interface has
+    a logger.
+    """
+    POLICIES = ('queue', 'replace', 'drop')
+    # stop sleeping this long before a deadline and spin for the remainder
+    SPIN_THRESHOLD = 0.001
+
+    def __init__(self, iointerface: "IOInterface", policy: str = 'queue'):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unsupported reward queueing policy: {policy}")
+        self.iointerface = iointerface
+        self.policy = policy
+        self.current: Optional[PulseTrain] = None
+        self._queue: "queue.Queue[PulseTrain | None]" = queue.Queue()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="RewardScheduler", daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self) -> bool:
+        return self.current is not None or not self._queue.empty()
+
+    def submit(self, train: PulseTrain, policy: Optional[str] = None) -> Optional[PulseTrain]:
+        """Schedule a pulse train, returns None if it was dropped"""
+        if policy is None:
+            policy = self.policy
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unsupported reward queueing policy: {policy}")
+        with self._lock:
+            if policy == 'drop' and self.busy:
+                return None
+            if policy == 'replace':
+                self._cancel_all()
+            self._queue.put(train)
+        return train
+
+    def cancel(self):
+        """Cancel the current train and any waiting trains"""
+        with self._lock:
+            self._cancel_all()
+
+    def _cancel_all(self):
+        while True:
+            try:
+                waiting = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if waiting is not None:
+                waiting.cancelled = True
+                waiting.done.set()
+        if self.current is not None:
+            self.current.cancelled = True
+            self._wake.set()
+
+    def _sleep_until(self, train: PulseTrain, deadline: float) -> bool:
+        """Sleep until the deadline, returns False if the train was cancelled"""
+        while True:
+            remaining = deadline - time.perf_counter()
+            if train.cancelled:
+                return False
+            if remaining <= self.SPIN_THRESHOLD:
+                break
+            self._wake.wait(remaining - self.SPIN_THRESHOLD)
+        while time.perf_counter() < deadline:
+            pass
+        return not train.cancelled
+
+    def _log(self, event_data: Dict[str, Any]):
+        logger = self.iointerface.logger
+        if logger is not None:
+            logger.log_event("Reward", event_data)
+
+    def _deliver(self, train: PulseTrain):
+        interval = train.interpulse_interval
+        if interval is None:
+            interval = train.duration
+        callbacks = self.iointerface.get_reward_callbacks(speed=train.speed, channels=train.channels)
+        callbacks['reward_setup_callback']()
+        start = time.perf_counter()
+        for pulse in range(train.n_pulses):
+            on_deadline = start + pulse * (train.duration + interval)
+            if not self._sleep_until(train, on_deadline):
+                break
+            callbacks['reward_on_callback']()
+            on_time = self.iointerface.clock()
+            self._log({"state": "on", "pulse": pulse, "time": on_time, "channels": train.channels})
+            # always turn the pump off, even if the train is cancelled mid-pulse
+            self._sleep_until(train, on_deadline + train.duration)
+            callbacks['reward_off_callback']()
+            off_time = self.iointerface.clock()
+            self._log({"state": "off", "pulse": pulse, "time": off_time, "channels": train.channels})
+            train.pulses.append((on_time, off_time))
+            if train.cancelled:
+                break
+
+    def _run(self):
+        while True:
+            train = self._queue.get()
+            if train is None:
+                break
+            with self._lock:
+                self._wake.clear()
+                self.current = train
+            try:
+                if not train.cancelled:
+                    self._deliver(train)
+            finally:
+                with self._lock:
+                    self.current = None
+                train.done.set()
+
+    def close(self):
+        self.cancel()
+        self._queue.put(None)
+        self._thread.join()
+
 
 class IOInterface:
-    def __init__(self):
+    def __init__(self, reward_policy: str = 'queue'):
         self.devices = {}
         self.reward_params = {}
+        self.reward_policy = reward_policy
+        self.reward_scheduler: Optional[RewardScheduler] = None
+        # set by the manager so reward timings end up in the session log
+        self.logger = None
+        self.clock: Callable[[], float] = time.time
 
     def add_device(self, name, device):
         self.devices[name] = device
 
-    def good_monkey(self, duration, n_pulses=1, interpulse_interval=None, speed=None, channels=None, return_callbacks=False):
-        if interpulse_interval is None:
-            interpulse_interval = duration
-        callbacks = self.get_reward_callbacks(speed=speed, channels=channels)
+    def good_monkey(self, duration, n_pulses=1, interpulse_interval=None, speed=None, channels=None, return_callbacks=False, block=False, policy=None):
         if return_callbacks:
-            return callbacks
+            return self.get_reward_callbacks(speed=speed, channels=channels)
 
-        callbacks['reward_setup_callback']()
-        for pulse in range(n_pulses):
-            callbacks['reward_on_callback']()
-            time.sleep(duration)
-            callbacks['reward_off_callback']()
-            if pulse < n_pulses - 1:
-                time.sleep(interpulse_interval)
+        if self.reward_scheduler is None:
+            self.reward_scheduler = RewardScheduler(self, self.reward_policy)
+        train = PulseTrain(
+            duration=duration,
+            n_pulses=n_pulses,
+            interpulse_interval=interpulse_interval,
+            channels=channels,
+            speed=speed
+        )
+        scheduled = self.reward_scheduler.submit(train, policy)
+        if block and scheduled is not None:
+            scheduled.wait()
+        return scheduled
+
+    def cancel_reward(self):
+        if self.reward_scheduler is not None:
+            self.reward_scheduler.cancel()
+
+    def close(self):
+        if self.reward_scheduler is not None:
+            self.reward_scheduler.close()
+            self.reward_scheduler = None
+        for device in self.devices.values():
+            close = getattr(device, 'close', None)
+            if close is not None:
+                close()
 
     def get_reward_callbacks(self, speed=None, channels=None):
         reward_device = self.devices.get('reward')
@@ -37,14 +209,24 @@ class IOInterface:
                 for channel in active_channels:
                     reward_device.set_speed(channel, speed)
 
+        # devices that can batch commands get all channels at once
+        start_pumps = getattr(reward_device, 'start_pumps', None)
+        stop_pumps = getattr(reward_device, 'stop_pumps', None)
+
         def reward_on():
+            if start_pumps is not None:
+                start_pumps(active_channels)
+                return
             for channel in active_channels:
                 reward_device.start_pump(channel)
 
         def reward_off():
+            if stop_pumps is not None:
+                stop_pumps(active_channels)
+                return
             for channel in active_channels:
                 reward_device.stop_pump(channel)
 
         return {'reward_setup_callback': reward_setup,
                 'reward_on_callback': reward_on,
-                'reward_off_callback': reward_off}
\ No newline at end of file
+                'reward_off_callback': reward_off}
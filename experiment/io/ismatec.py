@@ -1,20 +1,74 @@
+from typing import Callable, Iterable, List, Optional
+from collections import deque
+from dataclasses import dataclass, field
+import os
+import threading
+import time
+import queue
+import warnings
+
 import serial
 
+@dataclass
+class PumpCommand:
+    msg: str
+    queued: float
+    # when the write containing this command returned
+    sent: Optional[float] = None
+    # '*' on success, '#' on failure, or the data the pump replied with
+    response: Optional[str] = None
+    received: Optional[float] = None
+    # set if the command could not be written to the port
+    error: Optional[Exception] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the pump has responded to the command"""
+        return self.done.wait(timeout)
+
+
 class IsmatecPumpSerial:
-    def __init__(self, address):
+    """Ismatec pump driven over a serial port.
+
+    Commands are put on a queue and written by a dedicated writer thread, so
+    callers never block on the port. Everything waiting in the queue when the
+    writer wakes up is coalesced into a single write, e.g. starting channels
+    2 and 3 back to back. A reader thread matches the pump's responses to
+    the commands in the order they were sent. A command that cannot be
+    written is done straight away with ``error`` set, and counted in
+    ``errors``. The last ``history_size`` commands are kept in ``history``
+    with their queue, send and response times.
+    """
+    # how long the reader blocks before checking whether it should stop
+    READ_TIMEOUT = 0.1
+
+    def __init__(self, address, history_size: int = 1000, clock: Callable[[], float] = time.perf_counter):
         self.address = address
         self.baudrate = 9600
         self.channels = []
+        self.clock = clock
+        self.history: deque[PumpCommand] = deque(maxlen=history_size)
+        self.errors = 0
+        self.on_response: Optional[Callable[[PumpCommand], None]] = None
+        self._queue: "queue.Queue[List[PumpCommand] | None]" = queue.Queue()
+        self._awaiting: deque[PumpCommand] = deque()
+        self._awaiting_lock = threading.Lock()
+        self._running = False
     def init(self, channel_info):
         self.serial = serial.Serial(
-            self.address, self.baudrate, 
+            self.address, self.baudrate,
             parity=serial.PARITY_NONE,
             bytesize=8,
             stopbits=1,
-            timeout=None,
+            timeout=self.READ_TIMEOUT,
             xonxoff=0,
             rtscts=0
         )
+        self._running = True
+        self._writer = threading.Thread(target=self._write_loop, name="IsmatecWriter", daemon=True)
+        self._reader = threading.Thread(target=self._read_loop, name="IsmatecReader", daemon=True)
+        self._writer.start()
+        self._reader.start()
         self.sendmsg('1~1') # set channel addressing mode on startup
         for channel in channel_info:
             channel_number = channel['channel']
@@ -24,31 +78,194 @@ class IsmatecPumpSerial:
             self.set_rpm_mode(channel_number)
             self.set_direction(channel_number, clockwise)
             self.set_speed(channel_number, speed)
-    def sendmsg(self, msg):
-        msg = msg + '\r\n'
-        self.serial.write(msg.encode('utf-8'))
+    def sendmany(self, msgs: Iterable[str]) -> List[PumpCommand]:
+        """Queue several commands to be written together"""
+        now = self.clock()
+        commands = [PumpCommand(msg, now) for msg in msgs]
+        self._queue.put(commands)
+        return commands
+    def sendmsg(self, msg) -> PumpCommand:
+        return self.sendmany([msg])[0]
     def start_pump(self, channel):
-        self.sendmsg(f'{channel}H')
+        return self.sendmsg(f'{channel}H')
     def stop_pump(self, channel):
-        self.sendmsg(f'{channel}I')
+        return self.sendmsg(f'{channel}I')
+    def start_pumps(self, channels):
+        return self.sendmany(f'{channel}H' for channel in channels)
+    def stop_pumps(self, channels):
+        return self.sendmany(f'{channel}I' for channel in channels)
     def set_speed(self, channel, speed):
         msg = f"{channel}S0{speed:3.1f}".replace('.','')
-        self.sendmsg(msg)
+        return self.sendmsg(msg)
     def set_direction(self, channel, clockwise=True):
         direction = 'L'
         if not clockwise:
             raise NotImplementedError(":( look it up idk")
         msg = f"{channel}{direction}"
-        self.sendmsg(msg)
+        return self.sendmsg(msg)
     def set_rpm_mode(self, channel):
-        self.sendmsg(f"{channel}xRJ")
+        return self.sendmsg(f"{channel}xRJ")
+
+    def _write_loop(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                break
+            # coalesce everything else that is already waiting
+            stop = False
+            while True:
+                try:
+                    more = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    stop = True
+                    break
+                batch.extend(more)
+            payload = ''.join(command.msg + '\r\n' for command in batch).encode('utf-8')
+            with self._awaiting_lock:
+                self._awaiting.extend(batch)
+            try:
+                self.serial.write(payload)
+                self.serial.flush()
+            except (serial.SerialException, OSError) as e:
+                self._fail(batch, e)
+            else:
+                sent = self.clock()
+                for command in batch:
+                    command.sent = sent
+                    self.history.append(command)
+            if stop:
+                break
+
+    def _fail(self, batch: List[PumpCommand], error: Exception):
+        """Finish commands that were not written, the pump will not respond to them"""
+        failed = {id(command) for command in batch}
+        with self._awaiting_lock:
+            self._awaiting = deque(command for command in self._awaiting if id(command) not in failed)
+        self.errors += len(batch)
+        warnings.warn(f"Could not write {len(batch)} commands to the pump: {error}")
+        for command in batch:
+            command.error = error
+            self.history.append(command)
+            command.done.set()
+
+    def _respond(self, response: str):
+        with self._awaiting_lock:
+            command = self._awaiting.popleft() if self._awaiting else None
+        if command is None:
+            warnings.warn(f"Unexpected response from pump: {response!r}")
+            return
+        command.response = response
+        command.received = self.clock()
+        if response == '#':
+            self.errors += 1
+            warnings.warn(f"Pump rejected command {command.msg!r}")
+        command.done.set()
+        if self.on_response is not None:
+            self.on_response(command)
+
+    def _read_loop(self):
+        buffer = b''
+        while self._running:
+            try:
+                data = self.serial.read(1)
+            except (serial.SerialException, OSError, TypeError):
+                # the port was closed underneath us
+                break
+            if not data:
+                continue
+            if data in (b'*', b'#') and not buffer:
+                self._respond(data.decode())
+                continue
+            buffer += data
+            if buffer.endswith(b'\r\n'):
+                self._respond(buffer[:-2].decode('utf-8', errors='replace'))
+                buffer = b''
+
+    def close(self):
+        if not self._running:
+            return
+        self._queue.put(None)
+        self._writer.join()
+        self._running = False
+        self._reader.join()
+        self.serial.close()
+
+
+class VirtualIsmatecPump:
+    """Stand-in pump on a pseudo-terminal for testing without hardware.
+
+    Pass ``address`` to ``IsmatecPumpSerial``; every command line received is
+    recorded in ``received`` with its arrival time and acknowledged with '*'
+    after ``response_delay`` seconds.
+    """
+    def __init__(self, response_delay: float = 0., clock: Callable[[], float] = time.perf_counter):
+        self.response_delay = response_delay
+        self.clock = clock
+        self.received: List[tuple[float, str]] = []
+        self._master, self._slave = os.openpty()
+        self.address = os.ttyname(self._slave)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="VirtualIsmatecPump", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        buffer = b''
+        while self._running:
+            try:
+                data = os.read(self._master, 1024)
+            except OSError:
+                break
+            buffer += data
+            while b'\r\n' in buffer:
+                line, buffer = buffer.split(b'\r\n', 1)
+                self.received.append((self.clock(), line.decode('utf-8')))
+                if self.response_delay:
+                    time.sleep(self.response_delay)
+                os.write(self._master, b'*')
+
+    def close(self):
+        self._running = False
+        os.close(self._slave)
+        os.close(self._master)
+
+
+def benchmark(n_commands: int = 1000) -> dict:
+    """Measure command latency and throughput against a virtual pump"""
+    import statistics
+    virtual = VirtualIsmatecPump()
+    pump = IsmatecPumpSerial(virtual.address, history_size=n_commands + 100)
+    pump.init([{'channel': '2'}, {'channel': '3'}])
+    start = time.perf_counter()
+    commands = []
+    for i in range(n_commands // 2):
+        commands.extend(pump.start_pumps(pump.channels) if i % 2 == 0 else pump.stop_pumps(pump.channels))
+    for command in commands:
+        command.wait(timeout=5)
+    elapsed = time.perf_counter() - start
+    pump.close()
+    virtual.close()
+    send_latency = [c.sent - c.queued for c in commands if c.sent is not None]
+    response_latency = [c.received - c.queued for c in commands if c.received is not None]
+    return {
+        'commands': len(commands),
+        'throughput': len(commands) / elapsed,
+        'send_latency_median': statistics.median(send_latency),
+        'response_latency_median': statistics.median(response_latency),
+        'response_latency_max': max(response_latency),
+    }
+
 
 if __name__ == '__main__':
     import sys
-    import time
+    if sys.argv[1] == '--virtual':
+        print(benchmark())
+        sys.exit()
     addr = sys.argv[1]
     pump = IsmatecPumpSerial(addr)
     pump.init([{'channel': '1'}])
     pump.start_pump('1')
     time.sleep(1)
     pump.stop_pump('1')
+    pump.close()
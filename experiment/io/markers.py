@@ -0,0 +1,136 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import threading
+import time
+import queue
+
+class MarkerBackend:
+    def write(self, code: int) -> None: raise NotImplementedError()
+    def close(self) -> None: pass
+
+
+class FileMarkerBackend(MarkerBackend):
+    """Writes one code per line to a file, fifo or pty"""
+    def __init__(self, path: str):
+        self.file = open(path, 'a')
+    def write(self, code: int):
+        self.file.write(f"{code}\n")
+        self.file.flush()
+    def close(self):
+        self.file.close()
+
+
+class SerialMarkerBackend(MarkerBackend):
+    """Writes each code as ``nbytes`` little-endian bytes to a serial port"""
+    def __init__(self, address: str, baudrate: int = 115200, nbytes: int = 1):
+        import serial
+        self.nbytes = nbytes
+        self.serial = serial.Serial(address, baudrate, timeout=0)
+    def write(self, code: int):
+        self.serial.write(code.to_bytes(self.nbytes, 'little'))
+        self.serial.flush()
+    def close(self):
+        self.serial.close()
+
+
+class GPIOStrobeBackend(MarkerBackend):
+    """Parallel event-code output on GPIO pins with a strobe line.
+
+    The code is set on ``data_pins`` (least significant bit first), then the
+    strobe pin is held high for ``strobe_duration`` seconds and all lines are
+    cleared again.
+    """
+    def __init__(self, data_pins: Sequence[int], strobe_pin: int, strobe_duration: float = 0.001):
+        from experiment.io.GPIO import GPIO, TTL
+        GPIO.setmode(GPIO.BOARD)
+        GPIO.setwarnings(False)
+        self.data = [TTL(pin) for pin in data_pins]
+        self.strobe = TTL(strobe_pin)
+        self.strobe_duration = strobe_duration
+    def write(self, code: int):
+        if not 0 <= code < 2 ** len(self.data):
+            raise ValueError(f"Event code {code} does not fit on {len(self.data)} data pins")
+        for bit, ttl in enumerate(self.data):
+            if (code >> bit) & 1:
+                ttl.on()
+            else:
+                ttl.off()
+        self.strobe.on()
+        # strobes are short, spin rather than relying on sleep granularity
+        deadline = time.perf_counter() + self.strobe_duration
+        while time.perf_counter() < deadline:
+            pass
+        self.strobe.off()
+        for ttl in self.data:
+            ttl.off()
+
+
+BACKENDS = {
+    'file': FileMarkerBackend,
+    'serial': SerialMarkerBackend,
+    'gpio': GPIOStrobeBackend,
+}
+
+class MarkerOutput:
+    """Emits event codes through a backend on a worker thread.
+
+    Codes passed to ``schedule`` are held until the next display flip and
+    released by ``on_flip``, so they line up with the frame in which the
+    corresponding stimulus appeared. Codes passed to ``emit`` are sent
+    straight away. The strobe/write itself happens on the worker thread, so
+    the render thread never waits for it. Every code is logged as a
+    ``Marker`` event with the flip time and the measured emission time.
+    """
+    def __init__(self, backend: MarkerBackend, logger=None, clock: Callable[[], float] = time.time):
+        self.backend = backend
+        self.logger = logger
+        self.clock = clock
+        self.pending: List[tuple[int, Any]] = []
+        self._queue: "queue.Queue[tuple[int, Any, Optional[float]] | None]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="MarkerOutput", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, params: Dict[str, Any], logger=None, clock: Callable[[], float] = time.time) -> "MarkerOutput":
+        params = dict(params)
+        backend_type = params.pop('type')
+        if backend_type not in BACKENDS:
+            raise ValueError(f"Unsupported marker backend: {backend_type}")
+        return cls(BACKENDS[backend_type](**params), logger=logger, clock=clock)
+
+    def schedule(self, code: int, source: Any = None):
+        """Emit the code right after the next flip"""
+        self.pending.append((code, source))
+
+    def emit(self, code: int, source: Any = None):
+        """Emit the code now"""
+        self._queue.put((code, source, None))
+
+    def on_flip(self, flip_time: float):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        for code, source in pending:
+            self._queue.put((code, source, flip_time))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            code, source, flip_time = item
+            start = self.clock()
+            self.backend.write(code)
+            end = self.clock()
+            if self.logger is not None:
+                self.logger.log_event("Marker", {
+                    "code": code,
+                    "source": source,
+                    "flip_time": flip_time,
+                    "time": start,
+                    "duration": end - start,
+                })
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self.backend.close()
@@ -3,25 +3,34 @@ import os
 from pathlib import Path
 from datetime import datetime
 
-import yaml
 import json
+import math
 import warnings
 warnings.simplefilter("always")
 import time
+import random
+import threading
+import queue
 from collections import ChainMap
 
 from experiment.renderers.base import Renderer
 from experiment.taskmanager import TaskManager
 from experiment.events import EventManager, Event
 from experiment.datastore.base import DataStore
-from experiment.datastore.jsonstore import JSONDataStore
-from experiment.io.base import IOInterface
-from experiment.time_management import check_if_valid_time, get_pause_scene
+from experiment.datastore.index import LOG_ENTRY, append_index, append_indexed, event_key
+from experiment.io.base import IOInterface, PulseTrain
+from experiment.io.markers import MarkerOutput
+from experiment.util.frame_timing import FrameTimingRecorder
+from experiment.util.pacing import FramePacer
+from experiment.util.clock import SessionClock
+from experiment.util.behaviour import BehaviourSummary
+from experiment.registry import RENDERERS, IO_INTERFACES, REMOTE_SERVERS, DATASTORES
 
 if TYPE_CHECKING:
     from experiment.remote.base import RemoteServer
     from experiment.trial import Trial, TrialResult
     from experiment.experiments.scene import Scene
+    from experiment.io.ismatec import VirtualIsmatecPump
 
 class Identifier:
     def identify(self, manager) -> str | None:
@@ -30,22 +39,130 @@ class Identifier:
 class CameraManager: pass
 
 class Logger: 
-    def __init__(self):
+    """Writes events as JSON lines to each registered stream.
+
+    With ``index`` each stream gets a ``<stream>.idx`` sidecar with the byte
+    offset, event name and session time (from ``clock``, set by the manager)
+    of every line, see ``experiment.datastore.index.LogIndex``. It is off by
+    default here, as every event would open and append to a second file on
+    the calling thread; ``AsyncLogger`` indexes by default.
+    """
+    def __init__(self, index: bool = False):
         self.streams = []
+        self.index = index
+        self.clock: Optional[Callable[[], float]] = None
     def register_stream_handler(self, stream):
         self.streams.append(stream)
+    def index_entry(self, event) -> tuple[int, float]:
+        return event_key(event), self.clock() if self.clock is not None else math.nan
     def log_event(self, event, event_data):
+        line = (json.dumps({"event": event, **event_data}) + '\n').encode()
         for stream in self.streams:
-            if event == 'FrameDelay':
-                continue
-            with open(stream, 'a') as f:
-                f.write(json.dumps(event_data))
-                f.write('\n')
+            if self.index:
+                append_indexed(stream, [line], [self.index_entry(event)], LOG_ENTRY)
+            else:
+                with open(stream, 'ab') as f:
+                    f.write(line)
     def close(self):
         for stream in self.streams:
             # stream.close()
             pass
 
+class AsyncLogger(Logger):
+    """Logger that hands events to a background writer thread.
+
+    Streams are kept open for the lifetime of the logger. ``log_event`` only
+    pushes onto a bounded in-memory queue; the writer thread serialises and
+    flushes events in batches of at most ``batch_size`` events or every
+    ``flush_interval`` seconds, whichever comes first. If the queue is full
+    the event is dropped and counted in ``dropped`` rather than blocking the
+    caller. ``close`` drains the queue before closing the streams.
+    """
+    def __init__(self, 
+            max_queue_size: int = 10000, 
+            batch_size: int = 256, 
+            flush_interval: float = 0.25,
+            index: bool = True
+        ):
+        super().__init__(index=index)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        # events are logged from the frame loop, the remote server and device threads
+        self._dropped_lock = threading.Lock()
+        self._queue: "queue.Queue[tuple[str, Dict[str, Any], tuple[int, float]] | None]" = queue.Queue(maxsize=max_queue_size)
+        self._files = []
+        self._files_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="AsyncLogger", daemon=True)
+        self._thread.start()
+
+    def register_stream_handler(self, stream):
+        super().register_stream_handler(stream)
+        with self._files_lock:
+            self._files.append((stream, open(stream, 'ab')))
+
+    def log_event(self, event, event_data):
+        try:
+            # copy so that later mutation by the caller does not race the writer
+            self._queue.put_nowait((event, dict(event_data), self.index_entry(event)))
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _write(self, batch):
+        lines = [(json.dumps({"event": event, **event_data}) + '\n').encode() for event, event_data, _ in batch]
+        with self._files_lock:
+            for stream, f in self._files:
+                offset = f.tell()
+                f.write(b''.join(lines))
+                f.flush()
+                if self.index:
+                    append_index(stream, offset, lines, [entry for _, _, entry in batch], LOG_ENTRY)
+
+    def _run(self):
+        batch = []
+        running = True
+        while running:
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            if batch:
+                self._write(batch)
+                batch = []
+
+    def close(self):
+        if self._thread.is_alive():
+            # the sentinel must not be dropped, so block until there is room
+            self._queue.put(None)
+            self._thread.join()
+        with self._files_lock:
+            for _, f in self._files:
+                f.close()
+            self._files.clear()
+        if self.dropped:
+            warnings.warn(f"AsyncLogger dropped {self.dropped} events due to a full queue")
+
+def make_logger(params: Dict[str, Any]) -> Logger:
+    """Create a logger from the ``logger`` section of the config"""
+    params = dict(params)
+    mode = params.pop('mode', 'sync')
+    if mode == 'sync':
+        return Logger(**params)
+    elif mode == 'async':
+        return AsyncLogger(**params)
+    else:
+        raise ValueError(f"Unsupported logger mode: {mode}")
+
 def quit(scene: "Scene", event: Event) -> None:
     scene.quit = True
     scene.manager.logger.log_event("Quit", {"scene": str(scene)})
@@ -122,7 +239,8 @@ class Manager:
         remoteserver: "RemoteServer | None" = None,
         logger: Logger | None = None,
         taskmanager: Optional[TaskManager] = None,
-        data_directory: str | Path = './data'
+        data_directory: str | Path = './data',
+        clock: SessionClock | None = None
         ):
         if taskmanager is not None:
             # this will be deprecated
@@ -130,9 +248,9 @@ class Manager:
         if data_directory is None:
             data_directory = config.get('data_directory', './data')
         data_directory = Path(data_directory)
-        if renderer is None:
-            renderer_params = config.get('renderer', {})
-
+        if renderer is None and 'type' in config.get('renderer', {}):
+            renderer_params = dict(config['renderer'])
+            renderer = RENDERERS.get(renderer_params.pop('type'))(**renderer_params)
 
         self.config = config
         self.strict_mode = config.get('strict_mode', False)
@@ -140,24 +258,37 @@ class Manager:
         self.action_register: "Dict[str, Callable[[Scene, Event], None]]" = dict(ChainMap(config.get('actions', {}), self.DEFAULT_ACTIONS))
         self.hotkeys: Dict[str, Dict[str, Any]] = dict(ChainMap(config.get('hotkeys', {}), self.DEFAULT_HOTKEYS))
         self.pause = False
+        # the scene currently running, if any
+        self.scene: "Scene | None" = None
+        # count of scenes run in this session and frame slot within the current scene
+        self.scene_index = -1
+        self.frame_index = 0
+        if clock is None:
+            clock = SessionClock()
+        self.clock = clock
+        self.frame_pacing: Dict[str, Any] = config.get('frame_pacing', {})
 
         # set up our io devices
+        self.virtual_pump: "VirtualIsmatecPump | None" = None
         if iointerface is None:
             io = config.pop('io', {})
             io_type = io.get('type', 'base')
-            if io_type == 'base':
-                iointerface = IOInterface()
-            else:
-                raise ValueError("Unsupported IO interface type")
+            iointerface = IO_INTERFACES.get(io_type)(
+                reward_policy=(io.get('reward') or {}).get('policy', 'queue')
+            )
 
             reward_params = io.pop('reward', None)
             if reward_params is not None:
                 reward_device_type = reward_params.get('type')
-                if reward_device_type == 'ISMATEC_SERIAL':
+                if reward_device_type in ('ISMATEC_SERIAL', 'ISMATEC_VIRTUAL'):
                     address = reward_params.get("address")
                     channel_info = reward_params.get('channels')
-                    from experiment.io.ismatec import IsmatecPumpSerial
-                    reward_device = IsmatecPumpSerial(address)
+                    from experiment.io.ismatec import IsmatecPumpSerial, VirtualIsmatecPump
+                    if reward_device_type == 'ISMATEC_VIRTUAL':
+                        # pty stand-in, for running without the pump attached
+                        self.virtual_pump = VirtualIsmatecPump(clock=self.get_time)
+                        address = self.virtual_pump.address
+                    reward_device = IsmatecPumpSerial(address, clock=self.get_time)
                     try:
                         reward_device.init(channel_info)
                     except Exception as e:
@@ -170,41 +301,102 @@ class Manager:
                 else:
                     raise ValueError("Unsupported reward device type")
     
-        remote_settings = config.get('remote_server', {})
-        remote_enabled = remote_settings.get('enabled', False) or config.get('remote', False)
-        if remoteserver is None and remote_enabled:
-            from experiment.remote.flask import FlaskServer
-            path = remote_settings.get('template_path', None)
-            if path is not None:
-                path = Path(path).absolute().resolve()
-            remoteserver = FlaskServer(self, 
-                show=remote_settings.get('show', True), 
-                template_path=path
-            )
-            remoteserver.start()
-
         self.renderer = renderer
         self.eventmanager = eventmanager
         self.iointerface = iointerface
         self.taskmanager = taskmanager
         self.identifier = identifier
         self.cameramanager = cameramanager
-        self.remoteserver = remoteserver
         if logger is None:
-            logger = Logger()
+            logger = make_logger(config.get('logger', {}))
         self.logger = logger
-        self.session_directory = Path(data_directory, datetime.strftime(datetime.now(), "%Y%m%d_%H%M%S"))
+        self.logger.clock = self.get_time
+        if self.iointerface is not None:
+            self.iointerface.logger = self.logger
+            self.iointerface.clock = self.get_time
+        marker_params = config.get('markers')
+        self.markers: MarkerOutput | None = None
+        if marker_params is not None:
+            try:
+                self.markers = MarkerOutput.from_config(marker_params, logger=self.logger, clock=self.get_time)
+            except Exception as e:
+                if self.strict_mode:
+                    raise e
+                else:
+                    warnings.warn(f"Could not initialize marker output: {e}")
+        self.session_directory = Path(data_directory, datetime.strftime(self.clock.to_datetime(0.), "%Y%m%d_%H%M%S"))
         if not self.session_directory.exists():
             self.session_directory.mkdir(parents=True)
+        self.frame_timing = FrameTimingRecorder(self.session_directory / 'frame_timing.jsonl')
+        self.behaviour_summary = BehaviourSummary(**config.get('behaviour_summary', {}))
         if datastore is None:
-            self.datastore = JSONDataStore(self.session_directory)
+            datastore_params = dict(config.get('datastore', {}))
+            datastore_type = datastore_params.pop('type', 'json')
+            self.datastore = DATASTORES.get(datastore_type)(session_directory=self.session_directory, **datastore_params)
         else:
             self.datastore = datastore
             datastore.session_directory = self.session_directory
         self.logger.register_stream_handler(
             self.session_directory/'manager.log'
         )
+        self.logger.log_event("SessionClock", self.clock.anchor())
+        # the session's own generator, logged so that a session can be replayed
+        seed = config.get('seed')
+        self.seed = random.SystemRandom().randrange(2**32) if seed is None else seed
+        self.random = random.Random(self.seed)
+        if seed is not None:
+            # a configured seed also makes task code using the global generators reproducible
+            random.seed(seed)
+            import numpy as np
+            np.random.seed(seed % 2**32)
+        self.logger.log_event("Seed", {"seed": self.seed, "global": seed is not None})
+
+        self.remoteserver = remoteserver
+        self._remote_thread: Optional[threading.Thread] = None
+
+    def start_remote_server(self) -> None:
+        """Start the configured remote server on a background thread
+
+        Called at the start of ``run_session``; engines may call it earlier,
+        once the display is up. Only the first call starts a server, and
+        importing and starting it never delays the first frame.
+        """
+        remote_settings = self.config.get('remote_server', {})
+        remote_enabled = remote_settings.get('enabled', False) or self.config.get('remote', False)
+        if self.remoteserver is not None or not remote_enabled or self._remote_thread is not None:
+            return
+        def start():
+            server_cls = REMOTE_SERVERS.get(remote_settings.get('type', 'flask'))
+            path = remote_settings.get('template_path', None)
+            if path is not None:
+                path = Path(path).absolute().resolve()
+            remoteserver = server_cls(self,
+                show=remote_settings.get('show', True),
+                template_path=path,
+                stream_params=remote_settings.get('stream')
+            )
+            remoteserver.start()
+            self.remoteserver = remoteserver
+            self.logger.log_event("RemoteServer", {"time": self.get_time()})
+        self._remote_thread = threading.Thread(target=start, name="RemoteServerStartup", daemon=True)
+        self._remote_thread.start()
     
+    def detect_frame_duration(self) -> None:
+        """Set the frame duration from the configured or detected refresh rate"""
+        refresh_rate = self.config.get('refresh_rate')
+        if refresh_rate is None and self.renderer is not None:
+            refresh_rate = self.renderer.get_refresh_rate()
+        if refresh_rate:
+            self.frame_duration = 1 / refresh_rate
+        self.logger.log_event(
+            "FrameDuration",
+            {"refresh_rate": refresh_rate, "frame_duration": self.frame_duration}
+        )
+
+    def create_frame_pacer(self) -> FramePacer:
+        """Create the pacer used to schedule frames in a scene"""
+        return FramePacer(self.frame_duration, clock=self.clock.now, **self.frame_pacing)
+
     def identify(self) -> str | None:
         """Identify the subject"""
         if self.identifier is None:
@@ -215,10 +407,14 @@ class Manager:
     @overload
     def good_monkey(self, return_callbacks: Literal[True], **kwargs) -> Dict[str, Callable]: ...
     @overload
-    def good_monkey(self, return_callbacks: Literal[False] = False, **kwargs) -> None: ...
+    def good_monkey(self, return_callbacks: Literal[False] = False, **kwargs) -> PulseTrain | None: ...
+
+    def good_monkey(self, return_callbacks: bool = False, **kwargs) -> PulseTrain | None | Dict[str, Callable]:
+        """Reward the subject
 
-    def good_monkey(self, return_callbacks: bool = False, **kwargs) -> None | Dict[str, Callable]:
-        """Reward the subject"""
+        Pulses are delivered by the reward scheduler thread; pass
+        ``block=True`` to wait until delivery has finished.
+        """
         if (
             self.iointerface is None 
             or self.iointerface.devices.get('reward') is None):
@@ -238,15 +434,36 @@ class Manager:
                     f"No reward device: Tried to reward monkey with params {kwargs}"
                 )
                 return
-        return self.iointerface.good_monkey(return_callbacks=return_callbacks, **kwargs)
+        train = self.iointerface.good_monkey(return_callbacks=return_callbacks, **kwargs)
+        if isinstance(train, PulseTrain):
+            self.behaviour_summary.add_reward(train)
+        return train
     
+    def send_marker(self, code: int, source: Any = None, on_flip: bool = True) -> None:
+        """Send an event code, by default aligned to the next display flip"""
+        if self.markers is None:
+            if self.strict_mode:
+                raise ValueError("Cannot send event code if marker output is not provided")
+            warnings.warn(f"No marker output: Tried to send event code {code}")
+            return
+        if on_flip:
+            self.markers.schedule(code, source)
+        else:
+            self.markers.emit(code, source)
+
     def run_session(self, blockmanager) -> None:
         from experiment.experiments.adapters import TimeCounter
         from experiment.experiments.scene import Scene
+        from experiment.time_management import get_pause_scene
+        self.start_remote_server()
+        # draw conditions from the session generator, so that they replay
+        blockmanager.rng = self.random
         continue_session = True
         pause_scene = get_pause_scene(self)
         while continue_session:
-            if not check_if_valid_time(self.config, datetime.now()):
+            if not self.in_valid_time():
+                # logged so that a replay pauses on the same scenes
+                self.logger.log_event("ValidTimePause", {"scene": self.scene_index + 1})
                 pause_scene.run()
                 continue_session = not pause_scene.quit
                 continue
@@ -256,11 +473,13 @@ class Manager:
                 self.pause = not pause_scene.quit 
                 continue
             trial, condition_name, condition = blockmanager.get_next_trial()
-            now = datetime.now()
+            session_time = self.get_time()
+            now = self.clock.to_datetime(session_time)
             date, time = now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S.%f")
             self.record(
                 date=date,
                 time=time,
+                session_time=session_time,
                 block=blockmanager.current_block_idx,
                 block_number=blockmanager.current_block_number,
                 condition=condition_name,
@@ -277,6 +496,11 @@ class Manager:
                 iti_scene.run()
                 continue_session = not iti_scene.quit
     
+    def in_valid_time(self) -> bool:
+        """Whether trials may run now, see the 'valid_times' config"""
+        from experiment.time_management import check_if_valid_time
+        return check_if_valid_time(self.config, self.clock.to_datetime())
+
     def run_session_from_config(self, config: Dict[str, Any]) -> None:
         from experiment.blockmanager import BlockManager
         blockmanager = BlockManager.from_config(config)
@@ -286,22 +510,41 @@ class Manager:
         """Run a trial"""
         result = trial.run(self)
         self.datastore.flush()
+        record = {'outcome': result.outcome, **self.datastore.current_trial_record}
         self.datastore.trialid += 1
+        self.behaviour_summary.update(record)
         if self.remoteserver is not None:
-            self.remoteserver.notify_trial_end()
+            self.remoteserver.notify_trial_end(record, self.behaviour_summary.aggregates())
         return result
 
     def record(self, **kwargs):
         """Record data"""
         self.datastore.record(**kwargs)
+
+    def stream(self, name: str, dtype: Any = None, chunk_size: int = 4096):
+        """Typed sample stream for high rate data such as trajectories, see DataStore.stream"""
+        return self.datastore.stream(name, dtype, chunk_size)
     
     def cleanup(self):
         """Cleanup the experiment"""
+        if self.iointerface is not None:
+            self.iointerface.close()
+        if self.virtual_pump is not None:
+            # after the io interface, which holds the serial port to it
+            self.virtual_pump.close()
+        if self.markers is not None:
+            self.markers.close()
+        if self.eventmanager is not None:
+            self.eventmanager.close()
+        if self._remote_thread is not None:
+            # the server may still be starting up
+            self._remote_thread.join()
+        self.frame_timing.close()
         self.datastore.close()
         self.logger.close()
         if self.remoteserver is not None:
             self.remoteserver.stop()
     
     def get_time(self) -> float:
-        """Get the current time"""
-        return time.time()
\ No newline at end of file
+        """Get the current session time in seconds, see SessionClock"""
+        return self.clock.now()
\ No newline at end of file
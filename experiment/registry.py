@@ -0,0 +1,87 @@
+"""Named, lazily imported implementations of engines, renderers, IO, remote servers
+and datastores.
+
+Entries are registered as ``'module:attribute'`` strings and only imported
+when first looked up, so that e.g. choosing the headless engine never imports
+pygame and a disabled remote server never imports Flask. Third party packages
+can add entries through the ``experiment.engines``, ``experiment.renderers``,
+``experiment.io``, ``experiment.remote`` and ``experiment.datastores`` entry
+point groups, e.g.::
+
+    [project.entry-points."experiment.engines"]
+    myengine = "mypackage.engine:MyManager"
+"""
+from typing import Any, Dict, List
+from importlib import import_module
+
+class Registry:
+    def __init__(self, kind: str, group: str, entries: Dict[str, str] | None = None):
+        self.kind = kind
+        self.group = group
+        self._entries: Dict[str, Any] = dict(entries or {})
+        self._loaded: Dict[str, Any] = {}
+        self._scanned = False
+
+    def register(self, name: str, target: Any):
+        """Register an object, or a 'module:attribute' string to import on use"""
+        self._entries[name] = target
+        self._loaded.pop(name, None)
+
+    def _scan_entry_points(self):
+        if self._scanned:
+            return
+        self._scanned = True
+        from importlib.metadata import entry_points
+        for entry_point in entry_points(group=self.group):
+            self._entries.setdefault(entry_point.name, entry_point)
+
+    def names(self) -> List[str]:
+        self._scan_entry_points()
+        return list(self._entries)
+
+    def __contains__(self, name: str) -> bool:
+        if name not in self._entries:
+            self._scan_entry_points()
+        return name in self._entries
+
+    def get(self, name: str) -> Any:
+        if name in self._loaded:
+            return self._loaded[name]
+        if name not in self:
+            raise ValueError(f"Unsupported {self.kind}: {name}, expected one of {self.names()}")
+        target = self._entries[name]
+        if isinstance(target, str):
+            module, _, attribute = target.partition(':')
+            target = getattr(import_module(module), attribute)
+        elif hasattr(target, 'load'):
+            target = target.load()
+        self._loaded[name] = target
+        return target
+
+
+ENGINES = Registry('engine', 'experiment.engines', {
+    'pygame': 'experiment.engine.pygame:PygameManager',
+    'headless': 'experiment.engine.headless:HeadlessManager',
+    'flask': 'experiment.engine.flask.flask:FlaskManager',
+})
+
+RENDERERS = Registry('renderer', 'experiment.renderers', {
+    'pygame': 'experiment.renderers.pygame:PygameRenderer',
+    'null': 'experiment.renderers.null:NullRenderer',
+    'flask': 'experiment.engine.flask.flask:FlaskRenderer',
+    'display_list': 'experiment.engine.flask.flask:DisplayListRenderer',
+})
+
+IO_INTERFACES = Registry('IO interface', 'experiment.io', {
+    'base': 'experiment.io.base:IOInterface',
+    'rpi': 'experiment.io.GPIO:RPi_IOInterface',
+})
+
+REMOTE_SERVERS = Registry('remote server', 'experiment.remote', {
+    'flask': 'experiment.remote.flask:FlaskServer',
+})
+
+DATASTORES = Registry('datastore', 'experiment.datastores', {
+    'json': 'experiment.datastore.jsonstore:JSONDataStore',
+    'sqlite': 'experiment.datastore.sqlite:SQLiteDataStore',
+})
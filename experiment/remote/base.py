@@ -1,5 +1,8 @@
+from typing import Any, Dict
+
 class RemoteServer:
-    def notify_trial_end(self):
+    def notify_trial_end(self, trial: Dict[str, Any], aggregates: Dict[str, Any]):
+        """Called after each trial with its record and the updated behaviour summary"""
         pass
     def stop(self):
         pass
\ No newline at end of file
@@ -0,0 +1,121 @@
+from typing import Optional, Sequence, Set
+import threading
+import time
+
+import numpy as np
+import cv2
+
+from experiment.renderers.base import Renderer
+
+class LatestFrameSlot:
+    """Holds only the most recent encoded frame for one client.
+
+    A new frame replaces any frame the client has not picked up yet, so a
+    slow client skips frames instead of queueing them.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._data: Optional[bytes] = None
+        self._seq = 0
+
+    def put(self, data: bytes, seq: int):
+        with self._cond:
+            self._data = data
+            self._seq = seq
+            self._cond.notify_all()
+
+    def get(self, last_seq: int, timeout: float = 1.0) -> tuple[int, Optional[bytes]]:
+        """Wait for a frame newer than ``last_seq``, returns (seq, data)"""
+        with self._cond:
+            if self._seq == last_seq:
+                self._cond.wait(timeout=timeout)
+            if self._seq == last_seq:
+                return last_seq, None
+            return self._seq, self._data
+
+
+class FrameBroadcaster:
+    """Encodes each captured frame once and fans it out to all clients.
+
+    The encoder thread subscribes to the renderer while at least one client
+    is attached, encodes frames as JPEG at no more than ``fps`` frames per
+    second and hands the bytes to each client's ``LatestFrameSlot``.
+
+    Parameters
+    ----------
+    renderer: Renderer
+        Renderer providing captured frames via ``wait_frame``
+    quality: int
+        JPEG quality between 0 and 100
+    fps: float
+        Maximum number of frames encoded per second
+    size: Sequence[int] | None
+        Output (width, height), by default the captured frame size
+    """
+    def __init__(self,
+            renderer: Renderer,
+            quality: int = 80,
+            fps: float = 15,
+            size: Optional[Sequence[int]] = None
+        ):
+        self.renderer = renderer
+        self.quality = quality
+        self.interval = 1 / fps
+        self.size = tuple(size) if size is not None else None
+        self.encoded = 0
+        self._clients: Set[LatestFrameSlot] = set()
+        self._clients_changed = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_client(self) -> LatestFrameSlot:
+        slot = LatestFrameSlot()
+        with self._clients_changed:
+            if not self._clients:
+                self.renderer.subscribe_frames()
+            self._clients.add(slot)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="FrameBroadcaster", daemon=True)
+                self._thread.start()
+            self._clients_changed.notify_all()
+        return slot
+
+    def remove_client(self, slot: LatestFrameSlot):
+        with self._clients_changed:
+            self._clients.discard(slot)
+            if not self._clients:
+                self.renderer.unsubscribe_frames()
+
+    def encode(self, frame: np.ndarray) -> Optional[bytes]:
+        # captured frames are (width, height, RGB)
+        frame = np.transpose(frame, (1, 0, 2))
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        if self.size is not None and frame.shape[1::-1] != self.size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        success, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not success:
+            return None
+        return jpeg.tobytes()
+
+    def _run(self):
+        seq = None
+        last_encode = 0.
+        while True:
+            with self._clients_changed:
+                while not self._clients:
+                    self._clients_changed.wait()
+            delay = last_encode + self.interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            captured = self.renderer.wait_frame(seq, timeout=1.0)
+            if captured is None:
+                continue
+            seq, frame = captured
+            last_encode = time.perf_counter()
+            data = self.encode(frame)
+            if data is None:
+                continue
+            self.encoded += 1
+            with self._clients_changed:
+                clients = list(self._clients)
+            for slot in clients:
+                slot.put(data, seq)
@@ -3,18 +3,23 @@ from jinja2 import ChoiceLoader, FileSystemLoader
 from flask_socketio import SocketIO
 from flask import render_template, Response
 
-from typing import Optional
+from typing import Optional, Dict, Any
 import threading
-import numpy as np
-import cv2
 
 from experiment.manager import Manager
 from experiment.remote.base import RemoteServer
+from experiment.remote.broadcast import FrameBroadcaster
 
 class FlaskServer(RemoteServer):
-    def __init__(self, manager: Optional[Manager]=None, show=True, template_path=None):
+    def __init__(self, manager: Optional[Manager]=None, show=True, template_path=None, stream_params: Optional[Dict[str, Any]]=None):
         self.manager: Optional[Manager] = manager
         self.show = show
+        if stream_params is None:
+            stream_params = {}
+        self.stream_params = stream_params
+        self.broadcaster: Optional[FrameBroadcaster] = None
+        if manager is not None:
+            self.add_manager(manager)
         self.app = Flask(__name__, template_folder='templates/base')
         if template_path is not None:
             self.app.jinja_loader = ChoiceLoader([
@@ -25,15 +30,17 @@ class FlaskServer(RemoteServer):
         self.app.route('/')(self.index)
         self.app.route('/screen')(self.screen)
         self.app.route('/behaviour_summary')(self.behaviour_summary)
+        self.app.route('/frame_timing')(self.frame_timing)
 
         self.socketio.on_event('command', self.handle_command)
 
-    def notify_trial_end(self):
-        """Emit a socket event to clients indicating trial end."""
-        self.socketio.emit('trial_end', {'message': 'Trial has ended'})
+    def notify_trial_end(self, trial: Dict[str, Any], aggregates: Dict[str, Any]):
+        """Push the finished trial and the updated aggregates to clients"""
+        self.socketio.emit('trial_end', {'trial': trial, 'aggregates': aggregates})
 
     def add_manager(self, manager: Manager):
         self.manager = manager
+        self.broadcaster = FrameBroadcaster(manager.renderer, **self.stream_params)
 
     def handle_command(self, action):
         action['type'] = 'remote'
@@ -41,24 +48,29 @@ class FlaskServer(RemoteServer):
             self.manager.eventmanager.post_event(action)
 
     def generate_stream(self):
-        while True:
-            with self.manager.renderer._frame_ready:
-                self.manager.renderer._frame_ready.wait(timeout=1.0)
-
-                frame = self.manager.renderer.get_subject_screen()
-            
-            # Transpose and convert to BGR
-            frame = np.transpose(frame, (1, 0, 2))
-            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-
-            success, jpeg = cv2.imencode('.jpg', frame)
-            if success:
+        assert self.broadcaster is not None, "Manager not set for FlaskServer"
+        slot = self.broadcaster.add_client()
+        try:
+            seq = 0
+            while True:
+                seq, jpeg = slot.get(seq)
+                if jpeg is None:
+                    continue
                 yield (b'--frame\r\n'
-                    b'Content-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n')
+                    b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+        finally:
+            self.broadcaster.remove_client(slot)
 
     def behaviour_summary(self):
-        if self.manager.datastore is not None:
-            return jsonify(self.manager.datastore.records)
+        """Running aggregates and the trials after ``?since=<trialid>``"""
+        if self.manager is None:
+            return jsonify({})
+        since = request.args.get('since', type=int)
+        return jsonify(self.manager.behaviour_summary.delta(since))
+
+    def frame_timing(self):
+        if self.manager is not None:
+            return jsonify(self.manager.frame_timing.summary())
         else:
             return jsonify({})
 
@@ -83,5 +95,10 @@ class FlaskServer(RemoteServer):
         # self.socketio.run(self.app, host='0.0.0.0', port=5000, debug=True)
 
     def stop(self):
-        self.socketio.stop()
+        try:
+            self.socketio.stop()
+        except RuntimeError:
+            # stop() only works from within a request; the server thread is a
+            # daemon and will exit with the process
+            return
         self.flask_thread.join()
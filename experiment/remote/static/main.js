@@ -8,14 +8,48 @@ socket.on('response', function(data) {
     document.getElementById("response").innerText = data.message;
 });
 
+var behaviour = {aggregates: {}, trials: [], truncated: false};
+var lastTrialid = null;
+var maxTrials = 50;
+
+function showBehaviour() {
+    document.getElementById("behaviour_summary").textContent = JSON.stringify(behaviour, null, 2)
+}
+
+function addTrials(trials) {
+    behaviour.trials = behaviour.trials.concat(trials).slice(-maxTrials);
+    if (trials.length > 0) {
+        lastTrialid = trials[trials.length - 1].trialid;
+    }
+}
+
+// catch up on the trials we missed, e.g. after loading the page or reconnecting
 function fetchBehaviour() {
-    fetch('/behaviour_summary')
+    var url = '/behaviour_summary' + (lastTrialid === null ? '' : '?since=' + lastTrialid);
+    fetch(url)
     .then(response=>response.json())
     .then(data => {
-        document.getElementById("behaviour_summary").textContent = JSON.stringify(data, null, 2)
+        behaviour.aggregates = data.aggregates;
+        // the server no longer has some of the trials we missed, the ones
+        // we hold would be followed by a gap, so start again from its history
+        behaviour.truncated = data.truncated;
+        if (data.truncated) {
+            behaviour.trials = [];
+        }
+        addTrials(data.trials);
+        showBehaviour()
     })
 }
 socket.on('trial_end', function(data) {
-    fetchBehaviour()
+    // trials are pushed one at a time, fetch if we missed any
+    if (lastTrialid !== null && data.trial.trialid > lastTrialid + 1) {
+        fetchBehaviour();
+        return;
+    }
+    behaviour.aggregates = data.aggregates;
+    addTrials([data.trial]);
+    showBehaviour()
 })
-fetchBehaviour()
\ No newline at end of file
+socket.on('connect', function() {
+    fetchBehaviour()
+})
\ No newline at end of file
@@ -1,4 +1,5 @@
-from typing import Optional, TYPE_CHECKING
+from typing import Any, Optional, TYPE_CHECKING
+import time
 if TYPE_CHECKING:
     from experiment.experiments.adapters.BaseAdapter import BaseAdapter
 
@@ -10,4 +11,16 @@ class Renderer:
     def draw_rect(self, adapter: 'BaseAdapter'): raise NotImplementedError()
     def draw_circle(self, adapter: 'BaseAdapter'): raise NotImplementedError()
     def set_background(self, colour: Optional[str | tuple] = None): raise NotImplementedError()
-    def clear(self): raise NotImplementedError()
\ No newline at end of file
+    def clear(self): raise NotImplementedError()
+    def get_refresh_rate(self) -> Optional[float]: return None
+    def subscribe_frames(self): pass
+    def unsubscribe_frames(self): pass
+    def wait_frame(self, seq: Optional[int], timeout: float = 1.0) -> Optional[tuple[int, Any]]:
+        """Wait for a captured frame newer than ``seq``, returns (seq, frame)
+
+        Returns None if no newer frame was captured within ``timeout``.
+        Renderers that cannot capture frames always return None, after
+        waiting out the timeout so that callers do not spin.
+        """
+        time.sleep(timeout)
+        return None
@@ -0,0 +1,35 @@
+from typing import Optional, Sequence, TYPE_CHECKING
+from experiment.renderers.base import Renderer
+if TYPE_CHECKING:
+    from experiment.experiments.adapters.BaseAdapter import BaseAdapter
+
+class NullRenderer(Renderer):
+    """Renderer that draws nothing, for running sessions without a display.
+
+    Draw calls are counted per frame in ``draw_calls`` so that tests can
+    check what a scene would have shown.
+    """
+    def __init__(self, size: Sequence[int] = (800, 600), background: Optional[str | tuple] = None):
+        self.size = tuple(size)
+        self.default_background = background
+        self.background = background
+        self.frames = 0
+        self.draw_calls = 0
+    def initialize(self): pass
+    def pause(self): pass
+    def draw_image(self, adapter: 'BaseAdapter'):
+        self.draw_calls += 1
+    def draw_rdm(self, adapter: 'BaseAdapter'):
+        self.draw_calls += 1
+    def draw_rect(self, adapter: 'BaseAdapter'):
+        self.draw_calls += 1
+    def draw_circle(self, adapter: 'BaseAdapter'):
+        self.draw_calls += 1
+    def set_background(self, colour: Optional[str | tuple] = None):
+        self.background = self.default_background if colour is None else colour
+    def clear(self):
+        self.draw_calls = 0
+    def flip(self):
+        self.frames += 1
+    def get_subject_screen(self):
+        return None
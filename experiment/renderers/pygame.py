@@ -5,14 +5,98 @@ from experiment.experiments.adapters.graphic import *
 from experiment.util.colours import parse_colour
 
 import threading
+import time
+import statistics
+from collections import OrderedDict
+
+class SurfaceCache:
+    """LRU cache of converted and scaled surfaces for PIL images.
+
+    Entries are keyed by adapter identity, target size and orientation, as
+    adapters may share one image but each tracks its own ``image_version``.
+    An entry holds the image it was built from and is rebuilt when the
+    adapter's image or ``image_version`` changes. The least recently used
+    entries are evicted once the surfaces exceed ``max_bytes``.
+    """
+    def __init__(self, max_bytes: int = 256 * 2**20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, adapter: ImageAdapter) -> pygame.Surface:
+        image = adapter.image
+        size = tuple(int(v) for v in adapter.size)
+        key = (id(adapter), size, adapter.orientation)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is image and entry[1] == adapter.image_version:
+            self._entries.move_to_end(key)
+            return entry[2]
+        surface = self.convert(image, size)
+        nbytes = surface.get_pitch() * surface.get_height()
+        if entry is not None:
+            self.nbytes -= entry[3]
+        self._entries[key] = (image, adapter.image_version, surface, nbytes)
+        self._entries.move_to_end(key)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, _, _, evicted) = self._entries.popitem(last=False)
+            self.nbytes -= evicted
+        return surface
+
+    @staticmethod
+    def convert(image, size) -> pygame.Surface:
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+        surface = pygame.image.frombytes(image.tobytes(), image.size, image.mode)
+        surface = pygame.transform.scale(surface, size)
+        if has_alpha:
+            return surface.convert_alpha()
+        return surface.convert()
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
 
 class PygameRenderer(Renderer):
-    def __init__(self, display_params, background=None):
+    """Renderer drawing to a pygame display.
+
+    Frames are only captured for consumers such as the remote stream while at
+    least one is subscribed via ``subscribe_frames``. Captures are limited to
+    ``capture_params['fps']`` and downscaled by ``capture_params['scale']``.
+
+    With ``display_params['retained']`` set, draw calls are recorded instead
+    of painted. On ``flip`` the recorded commands are compared with the
+    previous frame and only the regions of commands that were added, removed
+    or changed are repainted and presented with ``pygame.display.update``.
+    Unchanged frames cost nothing to present. If the dirty area is large, the
+    stacking order changed or the background changed, the whole frame is
+    redrawn instead.
+    """
+    # repaint everything if the dirty regions cover more than this fraction
+    # of the screen or there are more than this many of them
+    MAX_DIRTY_FRACTION = 0.5
+    MAX_DIRTY_RECTS = 32
+    def __init__(self, display_params, background=None, capture_params=None):
         self._frame_ready = threading.Condition()
+        self._last_frame = None
+        self._frame_seq = 0
+        self._frame_consumers = 0
+        self._last_capture = 0.
+        if capture_params is None:
+            capture_params = {}
+        self.capture_interval = 1 / capture_params.get('fps', 20)
+        self.capture_scale = capture_params.get('scale', 0.5)
         self.display_params = display_params
         fullscreen = self.display_params.pop('fullscreen', False)
         if fullscreen:
             self.display_params['flags'] = pygame.FULLSCREEN
+        self.retained = self.display_params.pop('retained', False)
+        self._commands = []
+        self._previous_commands = []
+        self._full_redraw = True
+        surface_cache_mb = self.display_params.pop('surface_cache_mb', 256)
+        self.surface_cache = SurfaceCache(int(surface_cache_mb * 2**20))
         if background is None:
             background = (155,155,155)
         self.background = self.default_background = parse_colour(background)
@@ -21,17 +105,51 @@ class PygameRenderer(Renderer):
         pygame.init()
         self.screen = pygame.display.set_mode(**self.display_params)
     
+    def get_refresh_rate(self) -> Optional[float]:
+        # newer pygame builds can query the display mode directly
+        get_current_refresh_rate = getattr(pygame.display, 'get_current_refresh_rate', None)
+        if get_current_refresh_rate is not None:
+            rate = get_current_refresh_rate()
+            if rate:
+                return float(rate)
+        # otherwise time a few flips; this is only meaningful if flip is
+        # synchronised to the display (e.g. set_mode(vsync=1))
+        intervals = []
+        last = time.perf_counter()
+        for _ in range(30):
+            pygame.display.flip()
+            now = time.perf_counter()
+            intervals.append(now - last)
+            last = now
+        interval = statistics.median(intervals[5:])
+        if interval < 1/250:
+            return None
+        return 1 / interval
+
     def pause(self):
         self.screen.fill((0,0,0))
-        self.flip()
+        pygame.display.flip()
+        self._full_redraw = True
 
     def draw_rect(self, adapter: RectAdapter):
+        rect = pygame.Rect(*adapter.rect)
+        if self.retained:
+            colour = tuple(adapter.colour)
+            self._commands.append((('rect', colour, tuple(rect)), rect, pygame.draw.rect, (colour, rect)))
+            return rect
         return pygame.draw.rect(
             self.screen, 
             adapter.colour, 
-            pygame.Rect(*adapter.rect)
+            rect
         )
     def draw_circle(self, adapter: CircleAdapter):
+        if self.retained:
+            colour = tuple(adapter.colour)
+            x, y = adapter.position
+            r = adapter.size
+            rect = pygame.Rect(x - r, y - r, 2 * r + 1, 2 * r + 1)
+            self._commands.append((('circle', colour, (x, y), r), rect, pygame.draw.circle, (colour, (x, y), r)))
+            return rect
         return pygame.draw.circle(
             self.screen,
             adapter.colour,
@@ -39,40 +157,133 @@ class PygameRenderer(Renderer):
             adapter.size
         )
     def draw_image(self, adapter: ImageAdapter):
-        image = adapter.image
-        pyg_image = pygame.image.frombytes(
-            image.tobytes(),
-            image.size,
-            image.mode
-        )
-        pyg_image = pygame.transform.scale(
-            pyg_image,
-            adapter.size
-        )
-        return self.screen.blit(pyg_image, adapter.top_left)
+        surface = self.surface_cache.get(adapter)
+        rect = surface.get_rect(topleft=adapter.top_left)
+        if self.retained:
+            # cached surfaces are rebuilt when the image changes, so the
+            # surface identity stands in for the image contents
+            self._commands.append((('image', id(surface), tuple(rect)), rect, self._blit, (surface, rect)))
+            return rect
+        return self.screen.blit(surface, rect)
+
+    @staticmethod
+    def _blit(screen, surface, rect):
+        return screen.blit(surface, rect)
 
     def clear(self):
+        if self.retained:
+            self._commands = []
+            return
         self.screen.fill(self.background)
     
     def set_background(self, colour: Optional[str | Sequence[int]]=None):
         if colour is None:
             colour = self.default_background
         self.background = parse_colour(colour)
+        self._full_redraw = True
         self.clear()
         self.flip()
 
+    def dirty_rects(self) -> Optional[list]:
+        """Regions changed since the previous frame, None if a full redraw is needed"""
+        previous = {}
+        for position, (signature, rect, _, _) in enumerate(self._previous_commands):
+            previous.setdefault(signature, []).append((position, rect))
+        dirty = []
+        # previous positions of the commands that are still drawn, in drawing order
+        kept = []
+        for signature, rect, _, _ in self._commands:
+            entries = previous.get(signature)
+            if entries:
+                position, _ = entries.pop(0)
+                kept.append(position)
+            else:
+                dirty.append(rect)
+        for entries in previous.values():
+            dirty.extend(rect for _, rect in entries)
+        # the same commands in a different order change what is on top
+        if any(a > b for a, b in zip(kept, kept[1:])):
+            return None
+        merged = []
+        for rect in dirty:
+            rect = rect.clip(self.screen.get_rect())
+            if rect.width == 0 or rect.height == 0:
+                continue
+            for idx, other in enumerate(merged):
+                if rect.colliderect(other):
+                    merged[idx] = other.union(rect)
+                    break
+            else:
+                merged.append(rect)
+        if len(merged) > self.MAX_DIRTY_RECTS:
+            return None
+        w, h = self.screen.get_size()
+        if sum(rect.width * rect.height for rect in merged) > self.MAX_DIRTY_FRACTION * w * h:
+            return None
+        return merged
+
+    def repaint(self, region: Optional[pygame.Rect] = None):
+        self.screen.set_clip(region)
+        self.screen.fill(self.background)
+        for _, rect, paint, args in self._commands:
+            if region is None or rect.colliderect(region):
+                paint(self.screen, *args)
+        self.screen.set_clip(None)
+
+    def present(self):
+        if not self.retained:
+            pygame.display.flip()
+            return
+        dirty = None if self._full_redraw else self.dirty_rects()
+        if dirty is None:
+            self.repaint()
+            pygame.display.flip()
+        elif dirty:
+            for rect in dirty:
+                self.repaint(rect)
+            pygame.display.update(dirty)
+        self._full_redraw = False
+        self._previous_commands = self._commands
+
     def flip(self):
-        pygame.display.flip()
+        self.present()
+        if self._frame_consumers:
+            now = time.perf_counter()
+            if now - self._last_capture >= self.capture_interval:
+                self._last_capture = now
+                self.capture()
 
-        # Notify any waiting thread that a new frame is ready
+    def capture(self):
+        surface = self.screen
+        if self.capture_scale != 1:
+            w, h = surface.get_size()
+            size = max(1, int(w * self.capture_scale)), max(1, int(h * self.capture_scale))
+            surface = pygame.transform.smoothscale(surface, size)
+        # copy outside the lock, consumers only ever see complete frames
+        frame = pygame.surfarray.array3d(surface)
         with self._frame_ready:
-            self._last_frame = pygame.surfarray.pixels3d(self.screen).copy()
+            self._last_frame = frame
+            self._frame_seq += 1
             self._frame_ready.notify_all()
 
+    def subscribe_frames(self):
+        with self._frame_ready:
+            self._frame_consumers += 1
+
+    def unsubscribe_frames(self):
+        with self._frame_ready:
+            self._frame_consumers = max(0, self._frame_consumers - 1)
+
+    def wait_frame(self, seq, timeout=1.0):
+        with self._frame_ready:
+            if self._frame_seq == seq:
+                self._frame_ready.wait(timeout=timeout)
+            if self._frame_seq == seq or self._last_frame is None:
+                return None
+            return self._frame_seq, self._last_frame
+
     def get_subject_screen(self):
-        # Return last flipped frame, not the current in-progress buffer
+        # Return last captured frame, not the current in-progress buffer.
+        # Frames are replaced rather than modified so no copy is needed.
         with self._frame_ready:
-            if self._last_frame is not None:
-                return self._last_frame.copy()
-            else:
-                return pygame.surfarray.pixels3d(self.screen).copy()
\ No newline at end of file
+            return self._last_frame
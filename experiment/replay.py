@@ -0,0 +1,170 @@
+"""Replay recorded sessions and check that trial data comes out the same.
+
+Input events in ``manager.log`` are stamped with the scene and frame slot on
+which they were delivered. ``replay_session`` runs the task config on the
+headless engine with a ``ReplayEventManager`` that delivers each event on
+the same scene and frame, using the seed the original session logged, and
+then diffs the replayed ``data.jsonl`` against the original. Task code that
+draws from the global ``random`` or ``numpy.random`` generators only replays
+the same if the original session was configured with a ``seed``::
+
+    python -m experiment.replay config.py data/monkey/20250101_100000 [...]
+
+Fields that depend on wall-clock time are ignored by the diff. Pauses
+outside the configured ``valid_times`` depend on the wall clock too, so the
+replay pauses on the scenes the original logged a ``ValidTimePause`` for.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, TYPE_CHECKING
+from dataclasses import dataclass, field
+from pathlib import Path
+import copy
+import json
+import tempfile
+
+from experiment.engine.headless import HeadlessManager
+from experiment.events import EventManager, Event
+
+if TYPE_CHECKING:
+    from experiment.manager import Manager
+
+IGNORED_FIELDS = ('date', 'time', 'session_time')
+
+
+def read_log(session_directory: str | Path) -> List[Dict[str, Any]]:
+    with open(Path(session_directory, 'manager.log')) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def read_records(path: str | Path) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayEventManager(EventManager):
+    """Delivers recorded events on the scene and frame they were recorded on.
+
+    An event whose frame has already passed, e.g. because the replay
+    diverged from the original, is delivered on the next frame rather than
+    being lost.
+    """
+    def __init__(self, manager: "Manager", events: Iterable[Event]):
+        super().__init__(manager)
+        recorded = []
+        for event in events:
+            if 'scene' not in event or 'frame' not in event:
+                raise ValueError("Recorded events have no scene/frame stamps, the session cannot be replayed")
+            event = dict(event)
+            event.pop('event', None)
+            recorded.append(event)
+        recorded.sort(key=lambda event: (event['scene'], event['frame']))
+        self.recorded = recorded
+        self._next = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return self._next >= len(self.recorded)
+
+    def get_events(self) -> Sequence[Event]:
+        event_stack = super().get_events()
+        now = (self.manager.scene_index, self.manager.frame_index)
+        while self._next < len(self.recorded):
+            event = self.recorded[self._next]
+            if (event['scene'], event['frame']) > now:
+                break
+            event_stack.append(dict(event))
+            self._next += 1
+        self.log_events(event_stack)
+        return event_stack
+
+
+class ReplayManager(HeadlessManager):
+    """Headless manager that pauses outside valid times on the recorded scenes"""
+    def __init__(self, data_directory, config, pauses: Iterable[int] = (), **kwargs):
+        super().__init__(data_directory, config, **kwargs)
+        self.pauses = set(pauses)
+
+    def in_valid_time(self) -> bool:
+        return self.scene_index + 1 not in self.pauses
+
+
+@dataclass
+class ReplayResult:
+    session_directory: Path
+    n_original: int
+    n_replayed: int
+    # (trialid, field, original value, replayed value)
+    differences: List[tuple] = field(default_factory=list)
+
+    @property
+    def identical(self) -> bool:
+        return not self.differences and self.n_original == self.n_replayed
+
+
+def diff_records(
+        original: Sequence[Dict[str, Any]],
+        replayed: Sequence[Dict[str, Any]],
+        ignore: Sequence[str] = IGNORED_FIELDS
+    ) -> List[tuple]:
+    differences = []
+    for old, new in zip(original, replayed):
+        for key in sorted(set(old) | set(new)):
+            if key in ignore:
+                continue
+            if old.get(key) != new.get(key):
+                differences.append((old.get('trialid'), key, old.get(key), new.get(key)))
+    return differences
+
+
+def replay_session(config: Dict[str, Any] | str, session_directory: str | Path) -> ReplayResult:
+    """Replay a recorded session with the given task config and diff its data"""
+    from experiment.blockmanager import BlockManager
+    from experiment.util.config import load_config
+    if not isinstance(config, dict):
+        config = load_config(config)
+    config = copy.deepcopy(config)
+    session_directory = Path(session_directory)
+    log = read_log(session_directory)
+    original = read_records(session_directory / 'data.jsonl')
+    for entry in log:
+        if entry.get('event') == 'Seed':
+            config['seed'] = entry['seed']
+        elif entry.get('event') == 'FrameDuration' and entry.get('refresh_rate'):
+            config['refresh_rate'] = entry['refresh_rate']
+    # stop where the original stopped, even if it ended without a quit event
+    config['headless'] = {**config.get('headless', {}), 'max_trials': len(original)}
+    events = [entry for entry in log if entry.get('event') == 'event']
+    pauses = [entry['scene'] for entry in log if entry.get('event') == 'ValidTimePause']
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ReplayManager(tmp, config, pauses)
+        manager.eventmanager = ReplayEventManager(manager, events)
+        try:
+            manager.run_session(BlockManager.from_config(config))
+        finally:
+            manager.cleanup()
+        replayed = read_records(manager.datastore.json_path)
+    return ReplayResult(
+        session_directory=session_directory,
+        n_original=len(original),
+        n_replayed=len(replayed),
+        differences=diff_records(original, replayed),
+    )
+
+
+if __name__ == '__main__':
+    import sys
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay recorded sessions and diff their trial data")
+    parser.add_argument('config')
+    parser.add_argument('sessions', nargs='+')
+    args = parser.parse_args()
+    failed = 0
+    for session in args.sessions:
+        result = replay_session(args.config, session)
+        if result.identical:
+            print(f"{session}: {result.n_original} trials identical")
+            continue
+        failed += 1
+        print(f"{session}: {result.n_replayed}/{result.n_original} trials replayed, {len(result.differences)} differences")
+        for trialid, key, old, new in result.differences[:20]:
+            print(f"  trial {trialid} {key}: {old!r} -> {new!r}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,279 @@
+"""Run sessions with simulated subjects to tune block transition rules.
+
+Sessions run on the headless engine with a ``SimulatedEventManager`` whose
+subject policy responds to the touch and button adapters of the running
+scene. Many sessions are fanned out over a process pool and summarised with
+``aggregate``::
+
+    python -m experiment.simulation config.py --sessions 1000 --workers 8
+
+The subject is configured under ``simulation.subject`` in the task config,
+e.g. ``{'accuracy': {'floor': 0.5, 'ceiling': 0.9, 'tau': 200},
+'rt': {'distribution': 'lognormal', 'mu': -0.7, 'sigma': 0.3}}``, or with
+``module``/``class`` keys to load a custom ``SubjectPolicy``.
+"""
+from typing import Any, Dict, List, Optional, Sequence, TYPE_CHECKING
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import copy
+import math
+import random
+import statistics
+import tempfile
+
+from experiment.engine.headless import HeadlessManager
+from experiment.events import Event
+from experiment.events.scripted import ScriptedEventManager
+from experiment.experiments.adapters import BaseAdapter
+from experiment.experiments.adapters.Touch import TouchAdapter
+from experiment.experiments.adapters.Button import ButtonAdapter
+from experiment.util.python_import_helper import load_object_from_module
+
+if TYPE_CHECKING:
+    from experiment.manager import Manager
+    from experiment.experiments.scene import Scene
+
+# a touch here falls outside of any item
+OUTSIDE = (-1e6, -1e6)
+
+
+class ReactionTime:
+    """Reaction time distribution in seconds
+
+    ``distribution`` is one of 'fixed' (value), 'normal' (mean, sd),
+    'lognormal' (mu, sigma) or 'exgauss' (mu, sigma, tau).
+    """
+    def __init__(self, distribution: str = 'lognormal', minimum: float = 0.1, **params):
+        if distribution not in ('fixed', 'normal', 'lognormal', 'exgauss'):
+            raise ValueError(f"Unsupported reaction time distribution: {distribution}")
+        self.distribution = distribution
+        self.minimum = minimum
+        self.params = params
+
+    def sample(self, rng: random.Random) -> float:
+        p = self.params
+        if self.distribution == 'fixed':
+            rt = p.get('value', 0.5)
+        elif self.distribution == 'normal':
+            rt = rng.gauss(p.get('mean', 0.5), p.get('sd', 0.1))
+        elif self.distribution == 'lognormal':
+            rt = rng.lognormvariate(p.get('mu', -0.7), p.get('sigma', 0.3))
+        else:
+            rt = rng.gauss(p.get('mu', 0.4), p.get('sigma', 0.05)) + rng.expovariate(1 / p.get('tau', 0.1))
+        return max(self.minimum, rt)
+
+
+class LearningCurve:
+    """Accuracy rising exponentially from ``floor`` to ``ceiling`` with the
+    number of completed trials, with time constant ``tau`` trials"""
+    def __init__(self, floor: float = 0.5, ceiling: float = 0.9, tau: Optional[float] = None):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.tau = tau
+
+    def __call__(self, n_trials: int) -> float:
+        if not self.tau:
+            return self.ceiling
+        return self.ceiling - (self.ceiling - self.floor) * math.exp(-n_trials / self.tau)
+
+
+class SubjectPolicy:
+    """Decides how a simulated subject responds to a scene"""
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+
+    def respond(self, manager: "Manager", scene: "Scene") -> Sequence[Event]:
+        raise NotImplementedError()
+
+
+class SimpleSubject(SubjectPolicy):
+    """Responds once per scene to the first touch or button adapter in it.
+
+    After a sampled reaction time the subject responds with probability
+    ``p_respond``; the response is correct with the probability given by
+    ``accuracy`` (a number or LearningCurve spec) and otherwise goes to a
+    non-target item, or outside of all items.
+    """
+    def __init__(self,
+            accuracy: float | Dict[str, Any] = 0.8,
+            rt: Optional[Dict[str, Any]] = None,
+            p_respond: float = 1.0,
+            seed: Optional[int] = None
+        ):
+        super().__init__(seed)
+        if isinstance(accuracy, dict):
+            self.accuracy = LearningCurve(**accuracy)
+        else:
+            self.accuracy = LearningCurve(ceiling=accuracy)
+        self.rt = ReactionTime(**(rt or {}))
+        self.p_respond = p_respond
+        self._scene = None
+        self._response_time: Optional[float] = None
+
+    def find_response_adapter(self, scene: "Scene") -> Optional[BaseAdapter]:
+        stack = [scene.adapter] + list(scene.aux_adapters)
+        while stack:
+            adapter = stack.pop(0)
+            if isinstance(adapter, (TouchAdapter, ButtonAdapter)) and adapter.active:
+                return adapter
+            stack.extend(adapter.children)
+        return None
+
+    def respond(self, manager: "Manager", scene: "Scene") -> Sequence[Event]:
+        now = manager.get_time()
+        if scene is not self._scene:
+            self._scene = scene
+            self._response_time = None
+            if self.rng.random() < self.p_respond:
+                self._response_time = now + self.rt.sample(self.rng)
+        if self._response_time is None or now < self._response_time:
+            return []
+        adapter = self.find_response_adapter(scene)
+        if adapter is None:
+            return []
+        self._response_time = None
+        correct = self.rng.random() < self.accuracy(manager.datastore.trialid)
+        if isinstance(adapter, ButtonAdapter):
+            # a wrong key is ignored by the adapter, so an error is a miss
+            if not correct:
+                return []
+            return [{'type': 'key_down', 'key': adapter.keys[0], 'time': now}]
+        targets = [name for name in adapter.items if adapter.targets is None or name in adapter.targets]
+        if correct:
+            choices = targets
+        else:
+            choices = [name for name in adapter.items if name not in targets]
+        if choices:
+            x, y = adapter.items[self.rng.choice(choices)].position
+        else:
+            x, y = OUTSIDE
+        return [{'type': 'mouse_down', 'x': x, 'y': y, 'time': now}]
+
+
+def load_policy(spec: Dict[str, Any], seed: Optional[int] = None) -> SubjectPolicy:
+    spec = dict(spec)
+    module, class_name = spec.pop('module', None), spec.pop('class', None)
+    if module is not None:
+        policy_cls = load_object_from_module(module, class_name)
+    else:
+        policy_cls = SimpleSubject
+    return policy_cls(seed=seed, **spec)
+
+
+class SimulatedEventManager(ScriptedEventManager):
+    """Scripted event manager that also asks a subject policy for responses
+    to the running scene every frame"""
+    def __init__(self, manager: "Manager", subject: SubjectPolicy, script=()):
+        super().__init__(manager, script)
+        self.subject = subject
+
+    def get_events(self) -> Sequence[Event]:
+        scene = self.manager.scene
+        if scene is not None:
+            for event in self.subject.respond(self.manager, scene):
+                self.post_event(event)
+        return super().get_events()
+
+
+def run_session(config: Dict[str, Any] | str, seed: int = 0, data_directory: Optional[str] = None) -> Dict[str, Any]:
+    """Run one simulated session and summarise it"""
+    from experiment.blockmanager import BlockManager
+    from experiment.util.config import load_config
+    if not isinstance(config, dict):
+        config = load_config(config)
+    config = copy.deepcopy(config)
+    subject_spec = config.pop('simulation', {}).get('subject', {})
+    # the manager seeds the generator used by BlockManager and the global ones used by trials
+    config['seed'] = seed
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = HeadlessManager(data_directory or tmp, config)
+        # the manager's generator draws the conditions, the subject needs a stream of its own
+        subject_seed = random.Random(seed).getrandbits(64)
+        manager.eventmanager = SimulatedEventManager(manager, load_policy(subject_spec, subject_seed))
+        blockmanager = BlockManager.from_config(config)
+        try:
+            manager.run_session(blockmanager)
+        finally:
+            manager.cleanup()
+        records = list(getattr(manager.datastore, 'records', {}).values())
+    blocks = []
+    for record in records:
+        block = blockmanager.block_names[record['block']]
+        if not blocks or blocks[-1][0] != record['block_number']:
+            blocks.append((record['block_number'], block, record['trialid']))
+    return {
+        'seed': seed,
+        'n_trials': manager.datastore.trialid,
+        'session_time': manager.get_time(),
+        # trial outcomes are not recorded in the datastore, the manager's summary counts them
+        'outcomes': manager.behaviour_summary.aggregates()['outcomes'],
+        # (block name, trial at which it was entered) in the order visited
+        'blocks': [(name, trialid) for _, name, trialid in blocks],
+        'n_rewards': len(manager.rewards),
+        'reward_total': sum((train.duration or 0.) * train.n_pulses for train in manager.rewards),
+    }
+
+
+def run_sessions(config: Dict[str, Any] | str, n_sessions: int, workers: Optional[int] = None, seed: int = 0) -> List[Dict[str, Any]]:
+    """Run simulated sessions in a process pool, one seed per session"""
+    seeds = range(seed, seed + n_sessions)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_session, [config] * n_sessions, seeds))
+
+
+def _describe(values: Sequence[float]) -> Dict[str, float]:
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        'mean': statistics.fmean(values),
+        'median': statistics.median(values),
+        'p5': values[int(0.05 * (len(values) - 1))],
+        'p95': values[int(0.95 * (len(values) - 1))],
+    }
+
+
+def aggregate(results: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Summarise block progression, trial counts and rewards across sessions"""
+    outcomes = Counter()
+    for result in results:
+        outcomes.update(result['outcomes'])
+    total_trials = sum(result['n_trials'] for result in results)
+    trials_to_block: Dict[str, List[int]] = {}
+    final_blocks = Counter()
+    for result in results:
+        seen = set()
+        for name, trialid in result['blocks']:
+            if name not in seen:
+                seen.add(name)
+                trials_to_block.setdefault(name, []).append(trialid)
+        if result['blocks']:
+            final_blocks[result['blocks'][-1][0]] += 1
+    return {
+        'n_sessions': len(results),
+        'n_trials': _describe([result['n_trials'] for result in results]),
+        'outcome_rates': {k: v / total_trials for k, v in outcomes.items()} if total_trials else {},
+        'reward_total': _describe([result['reward_total'] for result in results]),
+        'n_blocks': _describe([len(result['blocks']) for result in results]),
+        'block_reached': {name: len(trials) / len(results) for name, trials in trials_to_block.items()},
+        'trials_to_block': {name: _describe(trials) for name, trials in trials_to_block.items()},
+        'final_block': dict(final_blocks),
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Run simulated sessions of a task")
+    parser.add_argument('config')
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, default=None, help="write per-session results as json")
+    args = parser.parse_args()
+    results = run_sessions(args.config, args.sessions, args.workers, args.seed)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f)
+    print(json.dumps(aggregate(results), indent=2))
@@ -0,0 +1,161 @@
+from typing import Any, Dict, List, Optional, Sequence
+from collections import Counter, deque
+import math
+import threading
+
+from experiment.io.base import PulseTrain
+
+
+class P2Quantile:
+    """Streaming estimate of a quantile in constant memory and time.
+
+    The P² algorithm (Jain & Chlamtac, 1985) keeps five markers whose heights
+    approximate the minimum, the quantile, the maximum and two points in
+    between, adjusting them with a piecewise parabolic fit as values arrive.
+    """
+    def __init__(self, p: float):
+        self.p = p
+        self.n = 0
+        self.heights: List[float] = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x: float):
+        self.n += 1
+        if len(self.heights) < 5:
+            self.heights.append(x)
+            self.heights.sort()
+            return
+        q = self.heights
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        for i in range(k + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        for i in (1, 2, 3):
+            d = self.desired[i] - self.positions[i]
+            if (d >= 1 and self.positions[i + 1] - self.positions[i] > 1) or (d <= -1 and self.positions[i - 1] - self.positions[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (self.positions[i + d] - self.positions[i])
+                q[i] = height
+                self.positions[i] += d
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self) -> Optional[float]:
+        if not self.heights:
+            return None
+        if len(self.heights) < 5:
+            # exact for the first few values
+            return self.heights[min(len(self.heights) - 1, int(self.p * len(self.heights)))]
+        return self.heights[2]
+
+
+def _scalar(value: Any) -> Any:
+    # keys recorded more than once in a trial hold a list, use the last value
+    return value[-1] if isinstance(value, list) and value else value
+
+
+class BehaviourSummary:
+    """Running aggregates of the trials of a session.
+
+    Fed one finished trial record at a time by the manager, it keeps outcome
+    counts overall and per block and condition, accuracy over the last
+    ``window`` trials, streaming quantiles of the ``rt_key`` value and reward
+    totals, each updated in constant time. The last ``history_size`` records
+    are kept so that clients can catch up with ``delta(since)``. Updates come
+    from the session thread and reads from the remote server, so both take a
+    lock and reads return copies.
+    """
+    def __init__(self,
+            window: int = 20,
+            correct_outcomes: Sequence[str] = ('correct',),
+            rt_key: str = 'reaction_time',
+            quantiles: Sequence[float] = (0.1, 0.5, 0.9),
+            history_size: int = 1000
+        ):
+        self.correct_outcomes = set(correct_outcomes)
+        self.rt_key = rt_key
+        self.n_trials = 0
+        self.last_trialid: Optional[int] = None
+        self.outcomes: Counter = Counter()
+        self.by_block: Dict[str, Counter] = {}
+        self.by_condition: Dict[str, Counter] = {}
+        self.recent: deque = deque(maxlen=window)
+        self.n_recent_correct = 0
+        self.quantiles = {p: P2Quantile(p) for p in quantiles}
+        self.n_rewards = 0
+        self.reward_total = 0.
+        self.history: deque = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+
+    def update(self, record: Dict[str, Any]):
+        outcome = _scalar(record.get('outcome'))
+        correct = outcome in self.correct_outcomes
+        # string keys, so that the counts can be serialised with sorted keys
+        outcome = str(outcome)
+        rt = _scalar(record.get(self.rt_key))
+        with self._lock:
+            self.n_trials += 1
+            self.last_trialid = record.get('trialid', self.n_trials - 1)
+            self.outcomes[outcome] += 1
+            if 'block' in record:
+                self.by_block.setdefault(str(_scalar(record['block'])), Counter())[outcome] += 1
+            if 'condition' in record:
+                self.by_condition.setdefault(str(_scalar(record['condition'])), Counter())[outcome] += 1
+            if len(self.recent) == self.recent.maxlen:
+                self.n_recent_correct -= self.recent[0]
+            self.recent.append(correct)
+            self.n_recent_correct += correct
+            if isinstance(rt, (int, float)) and not isinstance(rt, bool) and math.isfinite(rt):
+                for quantile in self.quantiles.values():
+                    quantile.add(rt)
+            self.history.append(dict(record))
+
+    def add_reward(self, train: PulseTrain):
+        with self._lock:
+            self.n_rewards += 1
+            self.reward_total += (train.duration or 0.) * train.n_pulses
+
+    def aggregates(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'n_trials': self.n_trials,
+                'last_trialid': self.last_trialid,
+                'outcomes': dict(self.outcomes),
+                'by_block': {k: dict(v) for k, v in self.by_block.items()},
+                'by_condition': {k: dict(v) for k, v in self.by_condition.items()},
+                'rolling_accuracy': self.n_recent_correct / len(self.recent) if self.recent else None,
+                'rt_quantiles': {str(p): q.value for p, q in self.quantiles.items()},
+                'n_rewards': self.n_rewards,
+                'reward_total': self.reward_total,
+            }
+
+    def delta(self, since: Optional[int] = None) -> Dict[str, Any]:
+        """Aggregates and the kept trials with trialid > since
+
+        ``truncated`` is set when trials after ``since`` have already been
+        dropped from the history.
+        """
+        with self._lock:
+            trials = [record for record in self.history if since is None or record.get('trialid', 0) > since]
+            dropped = self.n_trials > len(self.history)
+            oldest = self.history[0].get('trialid', 0) if self.history else 0
+        truncated = dropped and (since is None or oldest > since + 1)
+        return {'aggregates': self.aggregates(), 'trials': trials, 'truncated': truncated}
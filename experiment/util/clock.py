@@ -0,0 +1,61 @@
+from typing import Any, Dict, Optional
+from datetime import datetime
+import time
+
+class SessionClock:
+    """Monotonic clock shared by every part of a session.
+
+    Times are seconds since the clock was created, measured with
+    ``time.perf_counter_ns``. The wall-clock time at creation is kept as
+    ``wall_anchor`` so session times can be turned back into dates with
+    ``to_wall``/``to_datetime``; wall-clock adjustments during the session do
+    not affect session times.
+    """
+    def __init__(self):
+        self.start_ns = time.perf_counter_ns()
+        self.wall_anchor = time.time()
+
+    def now(self) -> float:
+        return (time.perf_counter_ns() - self.start_ns) / 1e9
+
+    def now_ns(self) -> int:
+        return time.perf_counter_ns() - self.start_ns
+
+    def from_perf_counter(self, perf_counter: float) -> float:
+        """Convert a ``time.perf_counter`` reading to session time"""
+        return perf_counter - self.start_ns / 1e9
+
+    def to_wall(self, session_time: float) -> float:
+        return self.wall_anchor + session_time
+
+    def to_datetime(self, session_time: Optional[float] = None) -> datetime:
+        if session_time is None:
+            session_time = self.now()
+        return datetime.fromtimestamp(self.to_wall(session_time))
+
+    def anchor(self) -> Dict[str, Any]:
+        return {
+            "perf_counter_ns": self.start_ns,
+            "wall_time": self.wall_anchor,
+            "datetime": datetime.fromtimestamp(self.wall_anchor).isoformat(),
+        }
+
+
+class VirtualClock(SessionClock):
+    """Session clock that only moves when advanced.
+
+    Used to run sessions faster than real time: the frame loop advances the
+    clock by exactly one frame instead of waiting for it.
+    """
+    def __init__(self, start: float = 0.):
+        super().__init__()
+        self.time = start
+
+    def now(self) -> float:
+        return self.time
+
+    def now_ns(self) -> int:
+        return int(self.time * 1e9)
+
+    def advance(self, seconds: float):
+        self.time += seconds
@@ -1,17 +1,18 @@
 from typing import Any, Dict
 from pathlib import Path
-
-import yaml
+import copy
 
 from experiment.util.python_import_helper import load_object_from_module
 
-def load_config(config: str | Path) -> Dict[str, Any]:
+def load_config(config: str | Path, bytecode: bool = True) -> Dict[str, Any]:
     config = Path(config).expanduser()
     if config.suffix in {'.yml', '.yaml'}:
+        import yaml
         with open(config, 'r') as f:
             cfg = yaml.safe_load(f)
     elif config.suffix == '.py':
-        cfg = load_object_from_module(config, 'config')
+        # the module is cached, callers get their own copy to modify
+        cfg = copy.deepcopy(load_object_from_module(config, 'config', bytecode=bytecode))
     else:
         raise ValueError("Unsupported config file type: {}".format(config.suffix))
-    return cfg
\ No newline at end of file
+    return cfg
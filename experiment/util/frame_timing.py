@@ -0,0 +1,181 @@
+from typing import Dict, Any, Optional
+from pathlib import Path
+import json
+import queue
+import threading
+import time
+
+PHASES = ('events', 'actions', 'update', 'render', 'flip', 'sleep')
+
+class Histogram:
+    """Fixed-width histogram of durations in seconds.
+
+    Memory and insertion cost are constant, so a histogram can be kept for
+    arbitrarily long scenes. Durations beyond ``limit`` go to an overflow bin
+    and are reported as ``max`` when they fall in a requested percentile.
+    """
+    def __init__(self, bin_width: float = 1e-4, limit: float = 0.1):
+        self.bin_width = bin_width
+        self.limit = limit
+        self.bins = [0] * (int(round(limit / bin_width)) + 1)
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def add(self, value: float):
+        idx = int(value / self.bin_width)
+        if idx >= len(self.bins):
+            idx = len(self.bins) - 1
+        self.bins[idx] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram"):
+        if len(other.bins) != len(self.bins) or other.bin_width != self.bin_width:
+            raise ValueError("Cannot merge histograms with different binning")
+        for idx, n in enumerate(other.bins):
+            self.bins[idx] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.
+        target = q / 100 * self.count
+        cumulative = 0
+        for idx, n in enumerate(self.bins):
+            cumulative += n
+            if cumulative >= target and n > 0:
+                if idx == len(self.bins) - 1:
+                    return self.max
+                # report the upper edge of the bin, capped at the observed max
+                return min((idx + 1) * self.bin_width, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+class SceneTiming:
+    """Per-phase frame timing for a single scene.
+
+    The scene loop calls ``begin_frame`` at the top of every frame and
+    ``mark(phase)`` after each phase; the time since the previous mark is
+    attributed to that phase. A phase may be marked more than once per frame,
+    in which case the durations are summed. ``end_frame`` commits the frame.
+    """
+    def __init__(self, name: str, frame_duration: float):
+        self.name = name
+        self.frame_duration = frame_duration
+        self.phases = {phase: Histogram() for phase in PHASES}
+        self.frames = Histogram()
+        self.dropped = 0
+        self._current = dict.fromkeys(PHASES, 0.)
+        self._frame_start = self._last_mark = time.perf_counter()
+
+    def begin_frame(self):
+        self._frame_start = self._last_mark = time.perf_counter()
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self._current[phase] += now - self._last_mark
+        self._last_mark = now
+
+    def elapsed(self) -> float:
+        """Time since the start of the current frame"""
+        return time.perf_counter() - self._frame_start
+
+    def end_frame(self):
+        now = time.perf_counter()
+        self.frames.add(now - self._frame_start)
+        if now - self._frame_start - self._current['sleep'] > self.frame_duration:
+            self.dropped += 1
+        for phase, value in self._current.items():
+            self.phases[phase].add(value)
+            self._current[phase] = 0.
+
+    def merge(self, other: "SceneTiming"):
+        for phase, histogram in other.phases.items():
+            self.phases[phase].merge(histogram)
+        self.frames.merge(other.frames)
+        self.dropped += other.dropped
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'scene': self.name,
+            'frame_duration': self.frame_duration,
+            'dropped_frames': self.dropped,
+            'frame': self.frames.summary(),
+            'phases': {phase: histogram.summary() for phase, histogram in self.phases.items()},
+        }
+
+
+class FrameTimingRecorder:
+    """Collects scene timings for a session.
+
+    Each finished scene is appended as one JSON line to ``path`` by a
+    background writer thread, so that summarising and writing it does not
+    delay the next scene's frames; ``close`` waits for pending scenes to be
+    written. Totals per scene name are kept for the whole session and,
+    together with the scene currently running, can be queried live through
+    ``summary``.
+    """
+    def __init__(self, path: Optional[str | Path] = None):
+        self.path = Path(path) if path is not None else None
+        self.current: Optional[SceneTiming] = None
+        self.totals: Dict[str, SceneTiming] = {}
+        self._queue: "queue.Queue[SceneTiming | None]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        if self.path is not None:
+            self._thread = threading.Thread(target=self._run, name="FrameTimingWriter", daemon=True)
+            self._thread.start()
+
+    def start_scene(self, name: str, frame_duration: float) -> SceneTiming:
+        self.current = SceneTiming(name, frame_duration)
+        return self.current
+
+    def end_scene(self, timing: SceneTiming):
+        if timing.name not in self.totals:
+            self.totals[timing.name] = SceneTiming(timing.name, timing.frame_duration)
+        self.totals[timing.name].merge(timing)
+        if self.current is timing:
+            self.current = None
+        if self._thread is not None:
+            # the scene is finished, so the writer is the only one using it now
+            self._queue.put(timing)
+
+    def _run(self):
+        f = None
+        try:
+            while (timing := self._queue.get()) is not None:
+                if f is None:
+                    f = open(self.path, 'a')
+                f.write(json.dumps(timing.summary()))
+                f.write('\n')
+                f.flush()
+        finally:
+            if f is not None:
+                f.close()
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def summary(self) -> Dict[str, Any]:
+        current = self.current
+        return {
+            'current': current.summary() if current is not None else None,
+            # copy first, the scene loop may add entries while we iterate
+            'totals': {name: timing.summary() for name, timing in dict(self.totals).items()},
+        }
@@ -0,0 +1,93 @@
+import time
+from typing import Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from experiment.util.clock import VirtualClock
+
+class FramePacer:
+    """Paces a frame loop against a fixed schedule of absolute deadlines.
+
+    Deadlines are multiples of ``frame_duration`` from ``start``, so sleep
+    overshoot does not accumulate into drift. ``wait`` sleeps coarsely until
+    ``spin_threshold`` seconds before the next deadline and then busy-waits
+    for the remainder. If a frame overran one or more deadlines the pacer
+    skips to the next deadline on the schedule and reports the number of
+    missed frames; ``tick`` always reflects the scheduled time elapsed between
+    the starts of the last two frames, so time-based adapters stay accurate.
+
+    Parameters
+    ----------
+    frame_duration: float
+        Target duration of a frame in seconds
+    spin_threshold: float
+        How long before the deadline to stop sleeping and start spinning
+    clock: Callable[[], float]
+        Monotonic clock in seconds, by default time.perf_counter
+    """
+    def __init__(self,
+            frame_duration: float,
+            spin_threshold: float = 0.002,
+            clock: Callable[[], float] = time.perf_counter
+        ):
+        self.frame_duration = frame_duration
+        self.spin_threshold = spin_threshold
+        self.clock = clock
+        self.tick = 0.
+        self.missed = 0
+        self.start()
+
+    def start(self):
+        self.frame_start = self.clock()
+        self.next_deadline = self.frame_start + self.frame_duration
+        self.tick = 0.
+        # frame slots since start, including missed ones
+        self.frame = 0
+
+    def sleep_until(self, deadline: float):
+        remaining = deadline - self.clock()
+        if remaining > self.spin_threshold:
+            time.sleep(remaining - self.spin_threshold)
+        while self.clock() < deadline:
+            pass
+
+    def wait(self) -> int:
+        """Wait for the start of the next frame
+
+        Returns
+        -------
+        missed: int
+            The number of frame deadlines that passed while the frame was
+            being produced
+        """
+        now = self.clock()
+        missed = 0
+        if now > self.next_deadline:
+            missed = int((now - self.next_deadline) // self.frame_duration) + 1
+            self.missed += missed
+        deadline = self.next_deadline + missed * self.frame_duration
+        self.sleep_until(deadline)
+        self.tick = deadline - self.frame_start
+        self.frame_start = deadline
+        self.next_deadline = deadline + self.frame_duration
+        self.frame += missed + 1
+        return missed
+
+
+class VirtualFramePacer(FramePacer):
+    """Frame pacer for a VirtualClock, ``wait`` advances the clock by one
+    frame instead of sleeping, so frames are never missed."""
+    def __init__(self, frame_duration: float, clock: "VirtualClock"):
+        self.virtual_clock = clock
+        super().__init__(frame_duration, spin_threshold=0., clock=clock.now)
+
+    def sleep_until(self, deadline: float):
+        self.virtual_clock.advance(max(0., deadline - self.clock()))
+
+    def wait(self) -> int:
+        deadline = self.next_deadline
+        self.sleep_until(deadline)
+        self.tick = deadline - self.frame_start
+        self.frame_start = deadline
+        self.next_deadline = deadline + self.frame_duration
+        self.frame += 1
+        return 0
@@ -1,12 +1,55 @@
+from typing import Dict, Tuple
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+from types import ModuleType
+import hashlib
 import importlib.util
+import re
+import sys
 
-def load_module(path):
-    spec = importlib.util.spec_from_file_location("module", path)
+# resolved path -> ((mtime_ns, size), module)
+_module_cache: Dict[Path, Tuple[Tuple[int, int], ModuleType]] = {}
+
+class _NoBytecodeLoader(SourceFileLoader):
+    """Compiles from source every time, neither reading nor writing __pycache__"""
+    def get_code(self, fullname):
+        return self.source_to_code(self.get_data(self.path), self.path)
+
+def module_name(path: Path) -> str:
+    """Unique, stable module name for a file loaded by path"""
+    digest = hashlib.sha1(str(path).encode()).hexdigest()[:8]
+    stem = re.sub(r'\W', '_', path.stem)
+    return f"_experiment_{stem}_{digest}"
+
+def load_module(path, bytecode: bool = True):
+    """Load a python file as a module, once per file.
+
+    Modules are cached by resolved path and reloaded only when the file's
+    modification time or size changes. Each file gets its own name in
+    ``sys.modules``, so classes defined in it can be pickled, e.g. for a
+    process pool. With ``bytecode`` the compiled file is cached in
+    ``__pycache__`` like a regular import.
+    """
+    path = Path(path).expanduser().resolve()
+    stat = path.stat()
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _module_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    name = module_name(path)
+    loader = None if bytecode else _NoBytecodeLoader(name, str(path))
+    spec = importlib.util.spec_from_file_location(name, path, loader=loader)
     assert spec is not None and spec.loader is not None, "Could not load module from path: {}".format(path)
     module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        sys.modules.pop(name, None)
+        raise
+    _module_cache[path] = (key, module)
     return module
 
-def load_object_from_module(path, object_name):
-    module = load_module(path)
-    return getattr(module, object_name)
\ No newline at end of file
+def load_object_from_module(path, object_name, bytecode: bool = True):
+    module = load_module(path, bytecode=bytecode)
+    return getattr(module, object_name)
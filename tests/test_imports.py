@@ -0,0 +1,14 @@
+import warnings
+
+import pytest
+
+from benchmarks.imports import IMPORT_BUDGETS, measure_import
+
+@pytest.mark.parametrize('module', list(IMPORT_BUDGETS))
+def test_import_budget(module):
+    result = measure_import(module)
+    assert not result['heavy_modules'], f"{module} imports {result['heavy_modules']}"
+    # wall-clock time depends on the host, so it is reported rather than asserted,
+    # `python -m benchmarks import_time --check` gates it on a quiet machine
+    if not result['within_budget']:
+        warnings.warn(f"{module} took {result['median']:.3f}s, budget {result['budget']}s")
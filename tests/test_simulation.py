@@ -0,0 +1,53 @@
+import pytest
+
+from experiment.experiments.adapters import TimeCounter
+from experiment.experiments.scene import Scene
+from experiment.simulation import aggregate, run_session
+from experiment.trial import Trial, TrialResult
+
+class StubTrial(Trial):
+    """Runs a short scene and ends with the outcome given by its condition"""
+    def __init__(self, outcome):
+        self.outcome = outcome
+    @classmethod
+    def from_config(cls, config):
+        return cls(config['outcome'])
+    def run(self, mgr):
+        Scene(mgr, TimeCounter(0.05)).run()
+        if self.outcome == 'correct':
+            mgr.good_monkey(duration=0.1)
+        return TrialResult(continue_session=True, outcome=self.outcome, data={})
+
+CONFIG = {
+    'headless': {'max_trials': 7},
+    'trial_types': {'default': {'module': __file__, 'class': 'StubTrial'}},
+    'conditions': {'hit': {'outcome': 'correct'}, 'miss': {'outcome': 'incorrect'}},
+    'ITI': 0,
+    'blocks': {
+        'train': {'length': 4, 'conditions': ['hit', 'miss'], 'transition': [{'condition': {'outcome': 'correct', 'min': 2}, 'next': 'test'}]},
+        'test': {'length': 3, 'conditions': ['hit']},
+    },
+}
+
+def test_run_session():
+    result = run_session(CONFIG, seed=1)
+    assert result['n_trials'] == 7
+    assert result['outcomes'] == {'correct': 5, 'incorrect': 2}
+    # two correct trials in train are enough to move on to test after its 4 trials
+    assert result['blocks'] == [('train', 0), ('test', 4)]
+    assert result['n_rewards'] == 5
+    assert result['reward_total'] == pytest.approx(0.5)
+
+def test_aggregate():
+    results = [run_session(CONFIG, seed=seed) for seed in range(3)]
+    summary = aggregate(results)
+    assert summary['n_sessions'] == 3
+    assert summary['outcome_rates'] == pytest.approx({'correct': 5 / 7, 'incorrect': 2 / 7})
+    assert summary['block_reached'] == {'train': 1.0, 'test': 1.0}
+    assert summary['final_block'] == {'test': 3}
+
+def test_seed_repeats():
+    config = {**CONFIG, 'blocks': {**CONFIG['blocks'], 'train': {**CONFIG['blocks']['train'], 'method': 'random'}}}
+    first, second = run_session(config, seed=3), run_session(config, seed=3)
+    assert first == second
+    assert sum(first['outcomes'].values()) == first['n_trials']